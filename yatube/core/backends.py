@@ -0,0 +1,59 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with metrics.template_timer():
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонизатор Django, замеряющий время отрисовки для метрик."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class MetricsCache:
+    """Обёртка над бэкендом кеша из OPTIONS['BACKEND'] со счётом попаданий.
+
+    Остальные методы и атрибуты берутся у исходного бэкенда.
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        backend = options.pop('BACKEND')
+        params['OPTIONS'] = options
+        self._cache = import_string(backend)(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        value = self._cache.get(key, missing, version=version)
+        if value is missing:
+            metrics.record_cache(misses=1)
+            return default
+        metrics.record_cache(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._cache.get_many(keys, version=version)
+        metrics.record_cache(hits=len(found), misses=len(keys) - len(found))
+        return found
@@ -0,0 +1,14 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с режимом начала транзакций из TRANSACTION_MODE.
+
+    Отложенная транзакция, которая сначала читает, а потом пишет, при
+    встречной записи получает «database is locked» сразу, без ожидания
+    busy_timeout. BEGIN IMMEDIATE берёт блокировку записи в начале.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict.get('TRANSACTION_MODE')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import copy_sqlite
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS'
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'Реплики не-SQLite баз синхронизирует сама СУБД'
+            ))
+            return
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            copy_sqlite(source, settings.DATABASES[alias]['NAME'])
+            self.stdout.write(f'{alias}: скопирована')
+        self.stdout.write(self.style.SUCCESS(
+            f'Синхронизировано реплик: {len(settings.DATABASE_REPLICAS)}'
+        ))
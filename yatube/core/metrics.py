@@ -0,0 +1,360 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, suppress
+
+from django.conf import settings
+
+# Имя метрики -> (тип, описание, границы корзин гистограммы).
+TIME_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса', TIME_BUCKETS,
+    ),
+    'yatube_sql_queries': (
+        'histogram', 'Число SQL-запросов за запрос',
+        (1, 2, 5, 10, 20, 50, 100, 200, 500),
+    ),
+    'yatube_sql_duration_seconds': (
+        'histogram', 'Время SQL-запросов за запрос', TIME_BUCKETS,
+    ),
+    'yatube_template_render_seconds': (
+        'histogram', 'Время отрисовки шаблонов за запрос', TIME_BUCKETS,
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Обращения к кешу по результату (hit или miss)', None,
+    ),
+}
+
+# Сумма метрик завершившихся процессов и блокировка её обновления
+ARCHIVE_FILE = 'metrics-archive.json'
+LOCK_FILE = 'metrics.lock'
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_started = time.time_ns()
+_last_flush = 0.0
+_local = threading.local()
+
+
+class RequestStats:
+    """Счётчики одного запроса, которые собирают обёртки SQL и шаблонов."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request():
+    stats = current_stats()
+    _local.stats = None
+    return stats
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+def sql_timer(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_time += time.perf_counter() - started
+
+
+@contextmanager
+def template_timer():
+    # Вложенные отрисовки уже учтены во внешней.
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+def record_cache(hits=0, misses=0):
+    stats = current_stats()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def observe(name, labels, value):
+    buckets = METRICS[name][2]
+    key = (name, label_key(labels))
+    with _lock:
+        histogram = _histograms.setdefault(
+            key, {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0}
+        )
+        index = next(
+            (i for i, bound in enumerate(buckets) if value <= bound),
+            len(buckets),
+        )
+        histogram['buckets'][index] += 1
+        histogram['sum'] += value
+
+
+def inc(name, labels, amount=1):
+    key = (name, label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe_request(view, method, duration, stats):
+    labels = {'view': view, 'method': method}
+    observe('yatube_request_duration_seconds', labels, duration)
+    observe('yatube_sql_queries', labels, stats.queries)
+    observe('yatube_sql_duration_seconds', labels, stats.sql_time)
+    observe('yatube_template_render_seconds', labels, stats.template_time)
+    for result, amount in (('hit', stats.cache_hits),
+                           ('miss', stats.cache_misses)):
+        if amount:
+            inc('yatube_cache_requests_total',
+                {'view': view, 'result': result}, amount)
+
+
+def process_file():
+    return os.path.join(
+        settings.METRICS_DIR, f'metrics-{os.getpid()}-{_started}.json'
+    )
+
+
+def write_data(path, data):
+    """Заменяет файл атомарно, чтобы читатели не видели его наполовину."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=settings.METRICS_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+def read_data(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def flush():
+    """Записывает метрики процесса в его собственный файл.
+
+    Каждый процесс пишет только свой файл и заменяет его атомарно,
+    поэтому процессам не нужны общие блокировки.
+    """
+    global _last_flush
+    with _lock:
+        data = {
+            'histograms': [
+                [name, labels, histogram]
+                for (name, labels), histogram in _histograms.items()
+            ],
+            'counters': [
+                [name, labels, value]
+                for (name, labels), value in _counters.items()
+            ],
+        }
+        _last_flush = time.monotonic()
+    write_data(process_file(), data)
+
+
+def maybe_flush():
+    if time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_stale_file(name):
+    """Файл остался от завершившегося процесса.
+
+    Свой pid с другим временем старта — прежний процесс с тем же pid,
+    например после перезапуска контейнера.
+    """
+    try:
+        pid, started = map(int, name[:-len('.json')].split('-')[1:])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return started != _started
+    return not pid_alive(pid)
+
+
+def merge(histograms, counters, data):
+    """Прибавляет к суммам метрики из данных одного файла."""
+    for metric, labels, histogram in data['histograms']:
+        if metric not in METRICS:
+            continue
+        key = (metric, tuple(map(tuple, labels)))
+        total = histograms.setdefault(key, {
+            'buckets': [0] * len(histogram['buckets']), 'sum': 0.0,
+        })
+        if len(total['buckets']) != len(histogram['buckets']):
+            continue
+        for index, count in enumerate(histogram['buckets']):
+            total['buckets'][index] += count
+        total['sum'] += histogram['sum']
+    for metric, labels, value in data['counters']:
+        key = (metric, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+
+
+def as_data(histograms, counters):
+    return {
+        'histograms': [
+            [name, [list(pair) for pair in labels], histogram]
+            for (name, labels), histogram in histograms.items()
+        ],
+        'counters': [
+            [name, [list(pair) for pair in labels], value]
+            for (name, labels), value in counters.items()
+        ],
+    }
+
+
+@contextmanager
+def files_lock():
+    """Одно чтение файлов метрик за раз, между всеми процессами."""
+    path = os.path.join(settings.METRICS_DIR, LOCK_FILE)
+    with open(path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def archive(paths):
+    """Переносит данные завершившихся процессов в ARCHIVE_FILE.
+
+    Все метрики накопительные: если бы суммы уменьшались при уходе
+    процесса, Prometheus принимал бы это за сброс счётчика и показывал
+    всплеск в rate(). Вызывается под files_lock.
+    """
+    path = os.path.join(settings.METRICS_DIR, ARCHIVE_FILE)
+    histograms = {}
+    counters = {}
+    for source in (path, *paths):
+        data = read_data(source)
+        if data is not None:
+            merge(histograms, counters, data)
+    write_data(path, as_data(histograms, counters))
+    for source in paths:
+        with suppress(OSError):
+            os.remove(source)
+
+
+def process_files():
+    """Данные файлов живых процессов и архива завершившихся."""
+    names = {
+        name for name in os.listdir(settings.METRICS_DIR)
+        if name.endswith('.json')
+    }
+    stale = {name for name in names if is_stale_file(name)}
+    if stale:
+        archive([
+            os.path.join(settings.METRICS_DIR, name) for name in stale
+        ])
+    for name in names - stale | {ARCHIVE_FILE}:
+        data = read_data(os.path.join(settings.METRICS_DIR, name))
+        if data is not None:
+            yield data
+
+
+def collect():
+    """Метрики всех процессов, сложенные из их файлов."""
+    flush()
+    histograms = {}
+    counters = {}
+    # Под блокировкой: иначе соседнее чтение могло бы перенести файл
+    # в архив между чтением файла и архива, и он учёлся бы дважды.
+    with files_lock():
+        for data in process_files():
+            merge(histograms, counters, data)
+    return histograms, counters
+
+
+def escape_label(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape_label(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def render_text(histograms, counters):
+    """Метрики в текстовом формате Prometheus."""
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        samples = histograms if kind == 'histogram' else counters
+        keys = sorted(key for key in samples if key[0] == name)
+        if not keys:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key in keys:
+            labels = key[1]
+            if kind == 'counter':
+                lines.append(f'{name}{format_labels(labels)} {samples[key]}')
+                continue
+            histogram = samples[key]
+            cumulative = 0
+            for bound, count in zip(
+                (*buckets, '+Inf'), histogram['buckets']
+            ):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{format_labels(labels, le=bound)} '
+                    f'{cumulative}'
+                )
+            lines.append(
+                f'{name}_sum{format_labels(labels)} {histogram["sum"]}'
+            )
+            lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,68 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+
+PIN_COOKIE = 'primary_pin'
+
+
+class MetricsMiddleware:
+    """Собирает время, SQL, шаблоны и кеш каждого запроса по имени URL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.sql_timer)
+                    )
+                return self.get_response(request)
+        finally:
+            metrics.finish_request()
+            match = getattr(request, 'resolver_match', None)
+            metrics.observe_request(
+                match.view_name if match else 'unresolved',
+                request.method,
+                time.perf_counter() - started,
+                stats,
+            )
+            metrics.maybe_flush()
+
+
+class ReplicaMiddleware:
+    """GET-запросы к REPLICA_APPS читают из реплик, догнавших основную базу.
+
+    Пока после записи реплики не синхронизированы, все читают из основной
+    базы. Ответ на запрос с записью вдобавок ставит куку, и ещё
+    REPLICA_PIN_SECONDS пользователь читает из основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routers.request_scope():
+            response = self.get_response(request)
+            if routers.wrote_to_primary():
+                response.set_cookie(
+                    PIN_COOKIE,
+                    '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.app_name in settings.REPLICA_APPS
+                and PIN_COOKIE not in request.COOKIES):
+            routers.use_replica()
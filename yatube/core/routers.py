@@ -0,0 +1,132 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Состояние текущего запроса: реплика для чтения и была ли запись.
+_state = threading.local()
+# mtime файлов идёт по грубым часам ядра и может отставать от
+# time.time_ns() на тик, поэтому запись, сделанная чуть позже начала
+# копирования, получает mtime чуть раньше него.
+MTIME_MARGIN_NS = 100_000_000
+
+
+@contextmanager
+def request_scope():
+    """Границы запроса: по умолчанию всё читается из основной базы."""
+    _state.replica = None
+    _state.wrote = False
+    try:
+        yield
+    finally:
+        _state.replica = None
+        _state.wrote = False
+
+
+def sqlite_changed_at(path):
+    """Время последней записи в файл SQLite или в его WAL, в нс."""
+    times = [0]
+    for name in (path, f'{path}-wal'):
+        try:
+            times.append(os.stat(name).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return max(times)
+
+
+def sqlite_copy_is_fresh(primary_path, replica_path):
+    """В основную базу не писали с начала последнего копирования в реплику.
+
+    copy_sqlite ставит файлу реплики mtime начала копирования.
+    """
+    try:
+        synced_at = os.stat(replica_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return sqlite_changed_at(primary_path) + MTIME_MARGIN_NS < synced_at
+
+
+def replica_is_fresh(alias):
+    """Реплика догнала основную базу и из неё можно читать.
+
+    Иначе читатель получил бы старые данные и положил бы их в кеш под
+    уже поднятой после записи версией лент и карточек. Свежесть
+    известна только для копий SQLite от sync_replicas.
+    """
+    if alias == DEFAULT_DB_ALIAS:
+        return True
+    replica = connections[alias]
+    primary = connections[DEFAULT_DB_ALIAS]
+    if replica.settings_dict['NAME'] == primary.settings_dict['NAME']:
+        return True
+    if replica.vendor != 'sqlite' or primary.vendor != 'sqlite':
+        return False
+    return sqlite_copy_is_fresh(
+        primary.settings_dict['NAME'], replica.settings_dict['NAME']
+    )
+
+
+def use_replica():
+    """Чтения до первой записи пойдут в случайную догнавшую реплику."""
+    fresh = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_is_fresh(alias)
+    ]
+    if fresh:
+        _state.replica = random.choice(fresh)
+
+
+def wrote_to_primary():
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    """Пишет в default, читает из реплики, если запрос это разрешил.
+
+    После первой записи запрос до конца читает из default, чтобы видеть
+    то, что сам записал.
+    """
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'replica', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.replica = None
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему копированием основной базы.
+        return db not in settings.DATABASE_REPLICAS
+
+
+def copy_sqlite(connection, path):
+    """Копирует базу SQLite через backup API и подменяет файл целиком.
+
+    Открытые соединения реплики дочитывают старый файл, новые видят
+    свежую копию. Внутри транзакции backup ждал бы её конца вечно.
+    Файл копии получает mtime начала копирования для replica_is_fresh.
+    """
+    if connection.in_atomic_block:
+        raise RuntimeError('Базу нельзя копировать внутри транзакции')
+    connection.ensure_connection()
+    started = time.time_ns()
+    temporary = f'{path}.tmp'
+    target = sqlite3.connect(temporary)
+    try:
+        connection.connection.backup(target)
+        # Копия WAL-базы тоже была бы в WAL, а файл реплики подменяется
+        # целиком, и -wal рядом с ним остался бы от прежнего файла.
+        target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+    os.replace(temporary, path)
+    os.utime(path, ns=(started, started))
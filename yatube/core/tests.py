@@ -1,6 +1,28 @@
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import connection, connections, router
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import metrics, routers
+from core.middleware import PIN_COOKIE
+from core.routers import copy_sqlite
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_METRICS_DIR = tempfile.mkdtemp()
 
 
 class ViewTestClass(TestCase):
@@ -13,3 +35,261 @@ class ViewTestClass(TestCase):
         '''Check if custom error page uses correct template'''
         response = self.client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(METRICS_DIR=TEMP_METRICS_DIR, METRICS_FLUSH_INTERVAL=0,
+                   METRICS_TOKEN='secret')
+class MetricsTestClass(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def request_count(self, view):
+        histograms, _ = metrics.collect()
+        key = (
+            'yatube_request_duration_seconds',
+            (('method', 'GET'), ('view', view)),
+        )
+        return sum(histograms.get(key, {'buckets': []})['buckets'])
+
+    def test_requests_are_recorded_per_url_name(self):
+        '''Check if a request is counted under its URL name'''
+        before = self.request_count('posts:index')
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.request_count('posts:index'), before + 1)
+        histograms, counters = metrics.collect()
+        labels = (('method', 'GET'), ('view', 'posts:index'))
+        for name in ('yatube_sql_queries', 'yatube_sql_duration_seconds',
+                     'yatube_template_render_seconds'):
+            with self.subTest(metric=name):
+                self.assertIn((name, labels), histograms)
+        self.assertGreater(
+            histograms['yatube_template_render_seconds', labels]['sum'], 0
+        )
+        self.assertTrue(any(
+            name == 'yatube_cache_requests_total'
+            and dict(labels)['view'] == 'posts:index'
+            for name, labels in counters
+        ))
+
+    def test_metrics_of_all_processes_are_merged(self):
+        '''Check if /metrics sums the files of every process'''
+        self.client.get(reverse('posts:index'))
+        before = self.request_count('posts:index')
+        other = {
+            'histograms': [[
+                'yatube_request_duration_seconds',
+                [['method', 'GET'], ['view', 'posts:index']],
+                {'buckets': [2] + [0] * len(metrics.TIME_BUCKETS),
+                 'sum': 0.002},
+            ]],
+            'counters': [],
+        }
+        # Файл родительского процесса: он жив, пока идут тесты.
+        path = os.path.join(TEMP_METRICS_DIR, f'metrics-{os.getppid()}-1.json')
+        with open(path, 'w') as file:
+            json.dump(other, file)
+        try:
+            self.assertEqual(self.request_count('posts:index'), before + 2)
+        finally:
+            os.remove(path)
+
+    def test_metrics_of_finished_processes_are_archived(self):
+        '''Check if finished processes keep their totals in one archive'''
+        self.client.get(reverse('posts:index'))
+        before = self.request_count('posts:index')
+        finished = subprocess.Popen(['true'])
+        finished.wait()
+        other = {
+            'histograms': [[
+                'yatube_request_duration_seconds',
+                [['method', 'GET'], ['view', 'posts:index']],
+                {'buckets': [2] + [0] * len(metrics.TIME_BUCKETS),
+                 'sum': 0.002},
+            ]],
+            'counters': [],
+        }
+        paths = [
+            os.path.join(TEMP_METRICS_DIR, f'metrics-{finished.pid}-1.json'),
+            os.path.join(TEMP_METRICS_DIR, f'metrics-{os.getpid()}-1.json'),
+        ]
+        for path in paths:
+            with open(path, 'w') as file:
+                json.dump(other, file)
+        self.assertEqual(self.request_count('posts:index'), before + 4)
+        for path in paths:
+            self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(
+            os.path.join(TEMP_METRICS_DIR, metrics.ARCHIVE_FILE)
+        ))
+        self.assertEqual(self.request_count('posts:index'), before + 4)
+
+    def test_metrics_endpoint_uses_text_format(self):
+        '''Check if /metrics answers in the Prometheus text format'''
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds histogram', content
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{method="GET",'
+            'view="posts:index",le="+Inf"}',
+            content,
+        )
+
+    def test_metrics_endpoint_is_closed_to_other_hosts(self):
+        '''Check if /metrics is not shown to outside addresses'''
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.1',
+            HTTP_AUTHORIZATION='Bearer secret',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_metrics_endpoint_needs_token(self):
+        '''Check if /metrics from a local address still needs the token'''
+        for authorization in ('', 'Bearer wrong', 'Basic c2VjcmV0'):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    reverse('metrics'), HTTP_AUTHORIZATION=authorization
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        with self.settings(METRICS_TOKEN=''):
+            response = self.client.get(
+                reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+            )
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+# Настоящих реплик в тестах нет: запросы «реплики» идут в default.
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingTestClass(TestCase):
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    @mock.patch('core.routers.replica_is_fresh', return_value=True)
+    def test_reads_leave_the_replica_after_a_write(self, replica_is_fresh):
+        '''Check if a request reads from the primary once it has written'''
+        with routers.request_scope():
+            self.assertEqual(router.db_for_read(Post), 'default')
+            routers.use_replica()
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), 'default')
+            self.assertTrue(routers.wrote_to_primary())
+        self.assertFalse(routers.wrote_to_primary())
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_lagging_replicas_are_skipped(self):
+        '''Check if reads stay on the primary until a replica catches up'''
+        with routers.request_scope():
+            with mock.patch('core.routers.replica_is_fresh',
+                            return_value=False):
+                routers.use_replica()
+            self.assertEqual(router.db_for_read(Post), 'default')
+            with mock.patch('core.routers.replica_is_fresh',
+                            side_effect=lambda alias: alias == 'replica2'):
+                routers.use_replica()
+            self.assertEqual(router.db_for_read(Post), 'replica2')
+
+    def test_only_unpinned_reads_of_posts_use_replicas(self):
+        '''Check if replicas serve only GET posts pages of unpinned users'''
+        user = User.objects.create_user(username='Reader')
+        self.client.force_login(user)
+        cases = (
+            ('get', reverse('posts:index'), {}, True),
+            ('get', reverse('about:author'), {}, False),
+            ('post', reverse('posts:post_create'), {'text': 'Текст'}, False),
+        )
+        for method, url, data, expected in cases:
+            with self.subTest(url=url, method=method):
+                with mock.patch('core.routers.use_replica') as use_replica:
+                    getattr(self.client, method)(url, data)
+                self.assertEqual(use_replica.called, expected)
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        '''Check if a write sets the pin cookie that skips replicas'''
+        user = User.objects.create_user(username='Reader')
+        author = User.objects.create_user(username='Author')
+        self.client.force_login(user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        response = self.client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': author.username})
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        with mock.patch('core.routers.use_replica') as use_replica:
+            self.client.get(reverse('posts:index'))
+        use_replica.assert_not_called()
+
+
+class ReplicaSyncTestClass(TransactionTestCase):
+    def test_sync_copies_the_primary_file(self):
+        '''Check if a replica file gets the rows of the primary'''
+        User.objects.create_user(username='Copied')
+        path = os.path.join(tempfile.mkdtemp(), 'replica.sqlite3')
+        try:
+            copy_sqlite(connection, path)
+            copy = sqlite3.connect(path)
+            try:
+                names = copy.execute(
+                    'SELECT username FROM auth_user'
+                ).fetchall()
+            finally:
+                copy.close()
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+        self.assertIn(('Copied',), names)
+
+    def test_replica_is_fresh_until_the_primary_changes(self):
+        '''Check if a write to the primary after a sync marks it stale'''
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        primary = os.path.join(directory, 'primary.sqlite3')
+        replica = os.path.join(directory, 'replica.sqlite3')
+        database = sqlite3.connect(primary)
+        database.execute('CREATE TABLE note (text TEXT)')
+        database.commit()
+        past = time.time_ns() - 10 * routers.MTIME_MARGIN_NS
+        os.utime(primary, ns=(past, past))
+        self.assertFalse(routers.sqlite_copy_is_fresh(primary, replica))
+        source = connections['default'].__class__(
+            {**connection.settings_dict, 'NAME': primary}, alias='primary'
+        )
+        try:
+            copy_sqlite(source, replica)
+        finally:
+            source.close()
+        self.assertTrue(routers.sqlite_copy_is_fresh(primary, replica))
+        database.execute("INSERT INTO note VALUES ('Новая')")
+        database.commit()
+        database.close()
+        self.assertFalse(routers.sqlite_copy_is_fresh(primary, replica))
+
+
+class SqliteProfileTestClass(SimpleTestCase):
+    def test_production_profile_applies_pragmas(self):
+        '''Check if a new connection gets the pragmas and BEGIN IMMEDIATE'''
+        directory = tempfile.mkdtemp()
+        connections.databases['profile'] = {
+            **settings.SQLITE_PRODUCTION_PROFILE,
+            'NAME': os.path.join(directory, 'profile.sqlite3'),
+        }
+        try:
+            connection = connections['profile']
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone(), ('wal',))
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone(), (5000,))
+            with mock.patch.object(connection, 'cursor') as cursor:
+                connection._start_transaction_under_autocommit()
+            cursor().execute.assert_called_with('BEGIN IMMEDIATE')
+        finally:
+            connections['profile'].close()
+            del connections.databases['profile']
+            shutil.rmtree(directory)
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as metrics_registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -7,3 +13,26 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_token_matches(request):
+    """Запрос несёт токен METRICS_TOKEN в заголовке Authorization."""
+    if not settings.METRICS_TOKEN:
+        return False
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    return hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(),
+        expected.encode(),
+    )
+
+
+def metrics(request):
+    # За обратным прокси на том же хосте все запросы приходят с 127.0.0.1,
+    # поэтому одного адреса мало: нужен ещё токен.
+    if (request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS
+            or not metrics_token_matches(request)):
+        raise Http404
+    return HttpResponse(
+        metrics_registry.render_text(*metrics_registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,10 +1,27 @@
 from django.contrib import admin
+from django.db import connections
 
 from .models import Comment, Group, Post
+from .search import match_expression, matching_ids, search_index_ready
+
+
+class FullTextSearchMixin:
+    """Поиск в админке по индексу FTS5 вместо LIKE '%...%'."""
+
+    def get_search_results(self, request, queryset, search_term):
+        # Строка из одних пробелов дала бы MATCH '' и ошибку FTS5.
+        if (not match_expression(search_term)
+                or not search_index_ready(connections[queryset.db])):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            pk__in=matching_ids(self.model, search_term)
+        ), False
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk',
                     'text',
                     'pub_date',
@@ -27,7 +44,7 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk',
                     'post',
                     'text',
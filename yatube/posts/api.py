@@ -0,0 +1,178 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from .conditional import (conditional_funcs, group_list_scopes, index_scopes,
+                          post_detail_scopes, profile_scopes)
+from .models import Comment, Group, Post, User
+from .utils import CursorPaginator, encode_cursor, is_db_int
+
+# Поля записи в ответе API и пути к ним от Post.
+POST_FIELDS = (
+    ('id', 'id'),
+    ('text', 'text'),
+    ('pub_date', 'pub_date'),
+    ('author', 'author__username'),
+    ('group', 'group__slug'),
+    ('image', 'image'),
+    ('comments_count', 'comments_count'),
+)
+# В ленте подписок id и дата записи лежат в самой TimelineEntry.
+TIMELINE_FIELDS = (
+    ('id', 'post_id'),
+    ('text', 'post__text'),
+    ('pub_date', 'pub_date'),
+    ('author', 'post__author__username'),
+    ('group', 'post__group__slug'),
+    ('image', 'post__image'),
+    ('comments_count', 'post__comments_count'),
+)
+COMMENT_FIELDS = (
+    ('id', 'id'),
+    ('text', 'text'),
+    ('created', 'created'),
+    ('author', 'author__username'),
+)
+
+
+class RowCursorPaginator(CursorPaginator):
+    """Курсорные страницы строк values_list вместо объектов моделей."""
+
+    def __init__(self, object_list, per_page, fields, keys=('pub_date', 'id')):
+        lookups = [lookup for _, lookup in fields]
+        super().__init__(object_list.values_list(*lookups), per_page, keys)
+        self.date_index = lookups.index(keys[0])
+        self.id_index = lookups.index(keys[1])
+
+    def cursor_for(self, row):
+        return encode_cursor((row[self.date_index], row[self.id_index]))
+
+
+def serialize(rows, fields):
+    names = [name for name, _ in fields]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def serialize_posts(rows, fields=POST_FIELDS):
+    posts = serialize(rows, fields)
+    for post in posts:
+        post['image'] = post['image'] and default_storage.url(post['image'])
+    return posts
+
+
+def feed_response(request, queryset, fields=POST_FIELDS,
+                  keys=('pub_date', 'id')):
+    paginator = RowCursorPaginator(
+        queryset, settings.NUMBER_OF_LAST_RECORDS, fields, keys
+    )
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return JsonResponse({
+        'results': serialize_posts(page.object_list, fields),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def not_found(message):
+    # Ошибки API — всегда JSON, а не HTML-страница 404.
+    return JsonResponse({'error': message}, status=404)
+
+
+def api_login_required(view):
+    """Вместо перенаправления на форму входа отвечает 401."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Нужно войти'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_GET
+@condition(**conditional_funcs(index_scopes))
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_GET
+@condition(**conditional_funcs(group_list_scopes))
+def group_list(request, group_name):
+    group = Group.objects.only('id').filter(slug=group_name).first()
+    if group is None:
+        return not_found('Группа не найдена')
+    return feed_response(request, group.posts.all())
+
+
+@require_GET
+@condition(**conditional_funcs(profile_scopes))
+def profile(request, username):
+    author = User.objects.only('id').filter(username=username).first()
+    if author is None:
+        return not_found('Автор не найден')
+    return feed_response(request, author.posts.all())
+
+
+@require_GET
+@api_login_required
+def follow_index(request):
+    return feed_response(
+        request, request.user.timeline.all(), TIMELINE_FIELDS,
+        keys=('pub_date', 'post_id'),
+    )
+
+
+@require_GET
+@condition(**conditional_funcs(post_detail_scopes))
+def post_detail(request, post_id):
+    lookups = [lookup for _, lookup in POST_FIELDS]
+    row = is_db_int(post_id) and Post.objects.filter(
+        pk=post_id
+    ).values_list(*lookups).first()
+    if not row:
+        return not_found('Запись не найдена')
+    paginator = RowCursorPaginator(
+        Comment.objects.filter(post_id=post_id), settings.COMMENTS_PER_PAGE,
+        COMMENT_FIELDS, keys=('created', 'id'),
+    )
+    comments = paginator.get_page(after=request.GET.get('comments_after'))
+    post, = serialize_posts([row])
+    post['comments'] = {
+        'results': serialize(comments.object_list, COMMENT_FIELDS),
+        'next': comments.next_cursor,
+    }
+    return JsonResponse(post)
+
+
+@require_GET
+def posts(request):
+    """Записи по списку ?ids=1,2,3 в порядке списка; ненайденных нет."""
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        ids = None
+    if ids is None or not all(map(is_db_int, ids)):
+        return JsonResponse({'error': 'ids — числа через запятую'},
+                            status=400)
+    if len(ids) > settings.API_MAX_IDS:
+        return JsonResponse(
+            {'error': f'Не больше {settings.API_MAX_IDS} id за запрос'},
+            status=400,
+        )
+    lookups = [lookup for _, lookup in POST_FIELDS]
+    rows = {
+        row[0]: row
+        for row in Post.objects.filter(
+            pk__in=ids
+        ).order_by().values_list(*lookups)
+    }
+    return JsonResponse({
+        'results': serialize_posts(
+            rows[pk] for pk in dict.fromkeys(ids) if pk in rows
+        ),
+    })
@@ -0,0 +1,229 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, UserCounters
+from .urls import urlpatterns
+
+CLIENTS = ('anonymous', 'authorized')
+PERCENTILES = (50, 95, 99)
+
+
+class Targets:
+    """Самые тяжёлые объекты набора данных, на которых меряются страницы."""
+
+    def __init__(self):
+        counters = UserCounters.objects.select_related('user')
+        self.reader = counters.order_by('-following_count').first().user
+        self.author = counters.order_by('-posts_count').first().user
+        self.post = Post.objects.order_by('-comments_count').first()
+        self.group = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first()
+        self.word = self.post.text.split()[0]
+        self.post_ids = list(Post.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True)[:settings.NUMBER_OF_LAST_RECORDS])
+
+
+def scenarios(targets):
+    """Запрос для каждого маршрута posts: (метод, адрес, данные).
+
+    Данные-строка — JSON-тело запроса.
+    """
+    author = {'username': targets.author.username}
+    post = {'post_id': targets.post.id}
+    return {
+        'index': ('get', reverse('posts:index'), {}),
+        'group_list': (
+            'get',
+            reverse('posts:group_list',
+                    kwargs={'group_name': targets.group.slug}),
+            {},
+        ),
+        'profile': ('get', reverse('posts:profile', kwargs=author), {}),
+        'post_detail': (
+            'get', reverse('posts:post_detail', kwargs=post), {}
+        ),
+        'post_comments': (
+            'get', reverse('posts:post_comments', kwargs=post), {}
+        ),
+        'post_create': (
+            'post', reverse('posts:post_create'), {'text': 'Замер'}
+        ),
+        'post_edit': ('get', reverse('posts:post_edit', kwargs=post), {}),
+        'add_comment': (
+            'post',
+            reverse('posts:add_comment', kwargs=post),
+            {'text': 'Замер'},
+        ),
+        'add_comment_fragment': (
+            'post',
+            reverse('posts:add_comment_fragment', kwargs=post),
+            {'text': 'Замер'},
+        ),
+        'follow_index': ('get', reverse('posts:follow_index'), {}),
+        'index_cards': ('get', reverse('posts:index_cards'), {}),
+        'group_cards': (
+            'get',
+            reverse('posts:group_cards',
+                    kwargs={'group_name': targets.group.slug}),
+            {},
+        ),
+        'profile_cards': (
+            'get', reverse('posts:profile_cards', kwargs=author), {}
+        ),
+        'follow_cards': ('get', reverse('posts:follow_cards'), {}),
+        'follow_bulk': (
+            'post',
+            reverse('posts:follow_bulk'),
+            json.dumps({'follow': [targets.author.username]}),
+        ),
+        'search': ('get', reverse('posts:search'), {'q': targets.word}),
+        'profile_follow': (
+            'get', reverse('posts:profile_follow', kwargs=author), {}
+        ),
+        'profile_unfollow': (
+            'get', reverse('posts:profile_unfollow', kwargs=author), {}
+        ),
+        'index_rss': ('get', reverse('posts:index_rss'), {}),
+        'index_atom': ('get', reverse('posts:index_atom'), {}),
+        'group_rss': (
+            'get',
+            reverse('posts:group_rss',
+                    kwargs={'group_name': targets.group.slug}),
+            {},
+        ),
+        'group_atom': (
+            'get',
+            reverse('posts:group_atom',
+                    kwargs={'group_name': targets.group.slug}),
+            {},
+        ),
+        'profile_rss': (
+            'get', reverse('posts:profile_rss', kwargs=author), {}
+        ),
+        'profile_atom': (
+            'get', reverse('posts:profile_atom', kwargs=author), {}
+        ),
+        'api_index': ('get', reverse('posts:api_index'), {}),
+        'api_group_list': (
+            'get',
+            reverse('posts:api_group_list',
+                    kwargs={'group_name': targets.group.slug}),
+            {},
+        ),
+        'api_profile': (
+            'get', reverse('posts:api_profile', kwargs=author), {}
+        ),
+        'api_follow_index': ('get', reverse('posts:api_follow_index'), {}),
+        'api_posts': (
+            'get',
+            reverse('posts:api_posts'),
+            {'ids': ','.join(str(pk) for pk in targets.post_ids)},
+        ),
+        'api_post_detail': (
+            'get', reverse('posts:api_post_detail', kwargs=post), {}
+        ),
+    }
+
+
+def missing_scenarios(requests):
+    return {pattern.name for pattern in urlpatterns} - set(requests)
+
+
+def send(client, method, url, data):
+    """Запрос сценария; тело-строка отправляется как JSON."""
+    if isinstance(data, str):
+        return getattr(client, method)(
+            url, data, content_type='application/json'
+        )
+    return getattr(client, method)(url, data)
+
+
+def measure(client, method, url, data, iterations, warmup=0, cold=False):
+    """Задержки в миллисекундах и число запросов к БД для каждого повтора."""
+    timings = []
+    queries = []
+    for attempt in range(warmup + iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            send(client, method, url, data)
+            elapsed = time.perf_counter() - started
+        if attempt >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+    return timings, queries
+
+
+def summarize(timings, queries):
+    cuts = statistics.quantiles(timings, n=100, method='inclusive')
+    summary = {
+        f'p{percentile}_ms': round(cuts[percentile - 1], 3)
+        for percentile in PERCENTILES
+    }
+    summary['queries'] = max(queries)
+    return summary
+
+
+def run_benchmark(iterations, warmup=0, cold=False):
+    """Замеряет каждый маршрут posts анонимом и вошедшим пользователем.
+
+    Результат: {'<маршрут>:<клиент>': {'p50_ms': …, 'queries': …}}.
+    """
+    targets = Targets()
+    requests = scenarios(targets)
+    missing = missing_scenarios(requests)
+    if missing:
+        raise ValueError(f'Нет сценария для маршрутов: {sorted(missing)}')
+    clients = {name: Client() for name in CLIENTS}
+    clients['authorized'].force_login(targets.reader)
+    results = {}
+    for name, (method, url, data) in requests.items():
+        for client_name, client in clients.items():
+            results[f'{name}:{client_name}'] = summarize(*measure(
+                client, method, url, data, iterations, warmup, cold
+            ))
+    return results
+
+
+def compare(previous, current, max_regression=None):
+    """Строки отчёта с изменением к прошлому замеру и список ухудшений.
+
+    Ухудшение — рост p95 больше чем на max_regression процентов или
+    рост числа запросов к БД.
+    """
+    lines = []
+    regressions = []
+    for key, result in sorted(current.items()):
+        before = previous.get(key)
+        line = (
+            f'{key:<34} p50 {result["p50_ms"]:>9.2f} '
+            f'p95 {result["p95_ms"]:>9.2f} p99 {result["p99_ms"]:>9.2f} '
+            f'queries {result["queries"]:>3}'
+        )
+        if before:
+            change = (
+                (result['p95_ms'] - before['p95_ms'])
+                / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+            )
+            line += (
+                f'  p95 {change:+.1f}% queries '
+                f'{result["queries"] - before["queries"]:+d}'
+            )
+            if (result['queries'] > before['queries']
+                    or max_regression is not None
+                    and change > max_regression):
+                regressions.append(key)
+        lines.append(line)
+    return lines, regressions
@@ -0,0 +1,132 @@
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+# Кеш версий и отметок, общий для всех процессов
+VERSIONS_CACHE = 'versions'
+GLOBAL_SCOPE = 'all'
+SITE_SCOPE = 'site'
+# Параметры, от которых зависит содержимое страницы ленты
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def card_scope(post_id):
+    # Отдельно от post_scope: комментарии карточку не меняют.
+    return f'card:{post_id}'
+
+
+def profile_scope(author_id):
+    return f'profile:{author_id}'
+
+
+def follows_scope(user_id):
+    return f'follows:{user_id}'
+
+
+def post_scopes(post):
+    """Ленты, страницы и карточка, в которых показывается запись."""
+    scopes = [
+        SITE_SCOPE,
+        author_scope(post.author_id),
+        post_scope(post.id),
+        card_scope(post.id),
+    ]
+    if post.group_id:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def version_key(scope):
+    return f'posts:feed-version:{scope}'
+
+
+def last_modified_key(scope):
+    return f'posts:last-modified:{scope}'
+
+
+def versions_cache():
+    return caches[VERSIONS_CACHE]
+
+
+def new_version():
+    # Версия после вытеснения ключа должна быть больше всех прежних,
+    # иначе снова станут видны фрагменты, сохранённые до сброса. Время
+    # вместо incr: у файлового кеша incr не атомарен, и два процесса
+    # могли бы получить одну и ту же версию.
+    return time.time_ns() // 1000
+
+
+def get_versions(scopes):
+    """Версии scopes одним обращением к кешу: {scope: версия}."""
+    cache = versions_cache()
+    keys = {scope: version_key(scope) for scope in scopes}
+    versions = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in versions:
+            cache.add(key, new_version(), None)
+            versions[key] = cache.get(key)
+    return {scope: versions[key] for scope, key in keys.items()}
+
+
+def feed_version(*scopes):
+    scopes = (GLOBAL_SCOPE, *scopes)
+    versions = get_versions(scopes)
+    return '.'.join(str(versions[scope]) for scope in scopes)
+
+
+def post_versions(post_ids):
+    """Версии записей {post_id: версия} для ключей их карточек.
+
+    Версия меняется при правке записи, а через GLOBAL_SCOPE — и при
+    переименовании группы или смене имени автора.
+    """
+    scopes = {post_id: card_scope(post_id) for post_id in post_ids}
+    versions = get_versions((GLOBAL_SCOPE, *scopes.values()))
+    return {
+        post_id: f'{versions[GLOBAL_SCOPE]}.{versions[scope]}'
+        for post_id, scope in scopes.items()
+    }
+
+
+def bump_feed_versions(*scopes):
+    cache = versions_cache()
+    now = timezone.now()
+    keys = [version_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    version = max([new_version(), *(value + 1 for value in current.values())])
+    cache.set_many(dict.fromkeys(keys, version), None)
+    cache.set_many(
+        {last_modified_key(scope): now for scope in scopes},
+        settings.LAST_MODIFIED_CACHE_TIMEOUT,
+    )
+
+
+def feed_cache_context(request, *scopes):
+    """Ключ и время жизни для {% cache %} вокруг карточек ленты.
+
+    Посторонние параметры запроса в ключ не входят, чтобы не плодить
+    копии одной и той же страницы.
+    """
+    page = urlencode([
+        (name, request.GET[name])
+        for name in PAGE_PARAMS if name in request.GET
+    ])
+    return {
+        'feed_cache_key': f'{feed_version(*scopes)}:{page}',
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import thumbnails
+from .caches import post_versions
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_THUMBNAIL = 'card'
+
+
+def card_key(post_id, version, flags):
+    variant = ','.join(sorted(name for name, value in flags.items() if value))
+    return f'posts:card:{variant}:{post_id}:{version}'
+
+
+def thumbnail_ready(post):
+    return not post.image or post.thumbnails[CARD_THUMBNAIL] is not None
+
+
+def prefetch_cards(posts, **flags):
+    """Кладёт в post.card HTML карточки каждой записи.
+
+    Карточки читаются из кеша одним get_many по ключам с версией записи,
+    отрисовываются только недостающие. Карточка без готовой миниатюры
+    не кешируется, чтобы миниатюра появилась, как только будет готова.
+    """
+    posts = list(posts)
+    versions = post_versions(post.id for post in posts)
+    keys = {
+        post.id: card_key(post.id, versions[post.id], flags)
+        for post in posts
+    }
+    cards = cache.get_many(keys.values())
+    missing = [post for post in posts if keys[post.id] not in cards]
+    thumbnails.prefetch_thumbnails(missing, CARD_THUMBNAIL)
+    rendered = {}
+    for post in missing:
+        card = render_to_string(CARD_TEMPLATE, {'post': post, **flags})
+        cards[keys[post.id]] = card
+        if thumbnail_ready(post):
+            rendered[keys[post.id]] = card
+    cache.set_many(rendered, settings.CARD_CACHE_TIMEOUT)
+    for post in posts:
+        post.card = mark_safe(cards[keys[post.id]])
@@ -0,0 +1,33 @@
+from django.core import checks
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .caches import VERSIONS_CACHE
+
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+@checks.register(checks.Tags.caches)
+def check_versions_cache(app_configs, **kwargs):
+    """Кеш версий должен быть общим для всех процессов.
+
+    Иначе запись, сохранённая в одном процессе, не меняет ETag и ключи
+    кеша в остальных, и они отвечают 304 и отдают старые карточки.
+    """
+    try:
+        cache = caches[VERSIONS_CACHE]
+    except InvalidCacheBackendError as exc:
+        return [checks.Error(
+            f'Кеш {VERSIONS_CACHE!r} не настроен: {exc}',
+            id='posts.E001',
+        )]
+    # MetricsCache хранит исходный бэкенд в _cache.
+    backends = (cache, getattr(cache, '_cache', None))
+    if any(isinstance(backend, PROCESS_LOCAL_CACHES) for backend in backends):
+        return [checks.Error(
+            f'Кеш {VERSIONS_CACHE!r} виден только своему процессу.',
+            hint='Используйте файловый кеш, memcached или кеш в базе.',
+            id='posts.E002',
+        )]
+    return []
@@ -0,0 +1,147 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Max
+
+from .caches import (GLOBAL_SCOPE, SITE_SCOPE, author_scope, feed_version,
+                     follows_scope, group_scope, last_modified_key,
+                     post_scope, profile_scope, versions_cache)
+from .models import Comment, Group, Post, User
+from .utils import is_db_int
+
+
+def latest_update(posts):
+    return posts.aggregate(last=Max('updated_at'))['last']
+
+
+def scope_last_modified_from_db(scope):
+    kind, _, value = scope.partition(':')
+    if kind == 'site':
+        return latest_update(Post.objects.all())
+    if kind == 'group':
+        return latest_update(Post.objects.filter(group_id=value))
+    if kind in ('author', 'profile'):
+        return latest_update(Post.objects.filter(author_id=value))
+    if kind == 'post':
+        dates = [
+            latest_update(Post.objects.filter(pk=value)),
+            Comment.objects.filter(
+                post_id=value
+            ).aggregate(last=Max('created'))['last'],
+        ]
+        return max(filter(None, dates), default=None)
+    return None
+
+
+def last_modified(*scopes):
+    """Время последнего изменения страницы, собранной из scopes.
+
+    Отметки хранятся в кеше и обновляются вместе с версиями лент; если
+    отметки нет, она восстанавливается по updated_at записей.
+    """
+    cache = versions_cache()
+    keys = {last_modified_key(scope): scope for scope in scopes}
+    marks = cache.get_many(keys)
+    for key, scope in keys.items():
+        if key not in marks:
+            marks[key] = scope_last_modified_from_db(scope)
+            if marks[key] is not None:
+                cache.set(key, marks[key],
+                          settings.LAST_MODIFIED_CACHE_TIMEOUT)
+    global_mark = cache.get(last_modified_key(GLOBAL_SCOPE))
+    return max(filter(None, (global_mark, *marks.values())), default=None)
+
+
+def page_etag(request, *scopes):
+    """ETag страницы: версии scopes, зритель, параметры и сообщения."""
+    user = request.user
+    parts = (
+        feed_version(*scopes),
+        str(user.pk) if user.is_authenticated else 'anonymous',
+        request.GET.urlencode(),
+        str(len(get_messages(request))),
+    )
+    return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def anonymous_last_modified(request, *scopes):
+    # Шапка страницы зависит от пользователя, поэтому вошедшим
+    # пользователям отдаётся только ETag, в который входит их id.
+    if request.user.is_authenticated:
+        return None
+    return last_modified(*scopes)
+
+
+def index_scopes(request):
+    return (SITE_SCOPE,)
+
+
+def group_list_scopes(request, group_name):
+    group_id = Group.objects.filter(
+        slug=group_name
+    ).values_list('id', flat=True).first()
+    if group_id is None:
+        return None
+    return (group_scope(group_id),)
+
+
+def profile_scopes(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('id', flat=True).first()
+    if author_id is None:
+        return None
+    scopes = [author_scope(author_id), profile_scope(author_id)]
+    if request.user.is_authenticated:
+        scopes.append(follows_scope(request.user.pk))
+    return scopes
+
+
+def author_scopes(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('id', flat=True).first()
+    if author_id is None:
+        return None
+    return (author_scope(author_id),)
+
+
+def post_detail_scopes(request, post_id):
+    if not is_db_int(post_id):
+        return None
+    author_id = Post.objects.filter(
+        pk=post_id
+    ).values_list('author_id', flat=True).first()
+    if author_id is None:
+        return None
+    return (post_scope(post_id), author_scope(author_id))
+
+
+def conditional_funcs(get_scopes, etag_func=page_etag,
+                      last_modified_func=anonymous_last_modified):
+    """Пара функций для django.views.decorators.http.condition.
+
+    Для несуществующих объектов заголовки не выставляются, и view
+    сам отвечает 404.
+    """
+    def scopes(request, *args, **kwargs):
+        if not hasattr(request, '_conditional_scopes'):
+            request._conditional_scopes = get_scopes(
+                request, *args, **kwargs
+            )
+        return request._conditional_scopes
+
+    def etag(request, *args, **kwargs):
+        page_scopes = scopes(request, *args, **kwargs)
+        if page_scopes is None:
+            return None
+        return etag_func(request, *page_scopes)
+
+    def modified(request, *args, **kwargs):
+        page_scopes = scopes(request, *args, **kwargs)
+        if page_scopes is None:
+            return None
+        return last_modified_func(request, *page_scopes)
+
+    return {'etag_func': etag, 'last_modified_func': modified}
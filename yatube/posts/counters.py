@@ -0,0 +1,67 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, UserCounters
+
+USER_COUNTER_SOURCES = {
+    'posts_count': (Post, 'author_id'),
+    'followers_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+}
+
+
+def rebuild_user_counters(user_ids):
+    """Пересчитывает счётчики пользователей по исходным таблицам."""
+    user_ids = list(user_ids)
+    values = {user_id: {} for user_id in user_ids}
+    for field, (model, key) in USER_COUNTER_SOURCES.items():
+        counted = dict(
+            model.objects.filter(
+                **{f'{key}__in': user_ids}
+            ).order_by().values_list(key).annotate(Count('pk'))
+        )
+        for user_id in user_ids:
+            values[user_id][field] = counted.get(user_id, 0)
+    existing = set(
+        UserCounters.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', flat=True)
+    )
+    for user_id in existing:
+        UserCounters.objects.filter(user_id=user_id).update(**values[user_id])
+    # Параллельный запрос мог создать строку после чтения existing.
+    UserCounters.objects.bulk_create(
+        (UserCounters(user_id=user_id, **values[user_id])
+         for user_id in user_ids if user_id not in existing),
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_comments_counts(posts):
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk')).values('total')
+    posts.update(comments_count=Coalesce(Subquery(comments), 0))
+
+
+def change_user_counter(user_id, field, delta):
+    updated = UserCounters.objects.filter(user_id=user_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+    if not updated and delta > 0:
+        rebuild_user_counters((user_id,))
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0)
+    )
+
+
+def counters_for(user):
+    """Счётчики пользователя; отсутствующая строка создаётся пересчётом."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        rebuild_user_counters((user.id,))
+        return UserCounters.objects.get(user_id=user.id)
@@ -0,0 +1,103 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+def version_key(model):
+    return f'posts:count-version:{model._meta.label_lower}'
+
+
+def invalidate_counts(*models):
+    """Сбрасывает закешированные количества записей для моделей."""
+    for model in models:
+        key = version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def queryset_signature(queryset):
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        return None
+    return hashlib.md5(sql.encode()).hexdigest()
+
+
+def update_statistics(connection):
+    """Собирает статистику ANALYZE, по которой работает estimate_count.
+
+    Сама SQLite её не собирает: без запуска после загрузки данных
+    (seed, manage.py update_statistics) оценки нет и каждый промах кеша
+    считает строки полным COUNT(*).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы по статистике ANALYZE (sqlite_stat1).
+
+    Работает только для запросов без фильтров; если статистики нет или
+    оценка ниже COUNT_ESTIMATE_THRESHOLD, возвращает None. Статистику
+    обновляет update_statistics.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'sqlite' or queryset.query.where:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                [queryset.model._meta.db_table],
+            )
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    estimate = max(
+        (int(stat.split()[0]) for stat, in rows if stat),
+        default=0,
+    )
+    if estimate < settings.COUNT_ESTIMATE_THRESHOLD:
+        return None
+    return estimate
+
+
+def get_count(queryset):
+    """Количество объектов в queryset с кешированием по сигнатуре запроса.
+
+    В ключ кеша входит версия модели, которую поднимают сигналы при
+    создании и удалении записей, и максимальный первичный ключ таблицы:
+    он замечает вставки в обход сигналов и из других процессов.
+    """
+    signature = queryset_signature(queryset)
+    if signature is None:
+        return 0
+    model = queryset.model
+    last_pk = model._default_manager.using(
+        queryset.db
+    ).aggregate(last_pk=Max('pk'))['last_pk']
+    version = cache.get(version_key(model), 0)
+    key = f'posts:count:{signature}:{version}:{last_pk}'
+    count = cache.get(key)
+    if count is None:
+        count = estimate_count(queryset)
+        if count is None:
+            count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return get_count(self.object_list)
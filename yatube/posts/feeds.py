@@ -0,0 +1,162 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from .caches import feed_version
+from .conditional import (author_scopes, conditional_funcs,
+                          group_list_scopes, index_scopes, last_modified)
+from .models import Group, Post, User
+
+TITLE_WORDS = 8
+
+
+class PostsFeed(Feed):
+    """Последние SYNDICATION_ITEMS записей из posts_for(obj)."""
+
+    def items(self, obj):
+        return self.posts_for(obj).select_related(
+            'author'
+        )[:settings.SYNDICATION_ITEMS]
+
+    def item_title(self, post):
+        return Truncator(post.text).words(TITLE_WORDS)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', kwargs={'post_id': post.id})
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_updateddate(self, post):
+        return post.updated_at
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов Yatube'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts_for(self, obj):
+        return Post.objects.all()
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, group_name):
+        return get_object_or_404(Group, slug=group_name)
+
+    def title(self, group):
+        return f'Yatube: группа {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', kwargs={'group_name': group.slug})
+
+    def posts_for(self, group):
+        return group.posts.all()
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: записи {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return self.title(author)
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def posts_for(self, author):
+        return author.posts.all()
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        description = self.description
+        return description(obj) if callable(description) else description
+
+
+class AtomIndexFeed(AtomMixin, IndexFeed):
+    pass
+
+
+class AtomGroupFeed(AtomMixin, GroupFeed):
+    pass
+
+
+class AtomAuthorFeed(AtomMixin, AuthorFeed):
+    pass
+
+
+def feed_origin(request):
+    """Схема и хост запроса: из них строятся абсолютные ссылки в XML."""
+    return f'{request.scheme}://{request.get_host()}{request.path}'
+
+
+def feed_etag(request, *scopes):
+    # Лента одна для всех читателей: в ETag нет пользователя.
+    return hashlib.md5(
+        f'{feed_version(*scopes)}:{feed_origin(request)}'.encode()
+    ).hexdigest()
+
+
+def feed_last_modified(request, *scopes):
+    return last_modified(*scopes)
+
+
+def cached_feed(feed, get_scopes):
+    """View ленты с готовым XML в кеше и ответами 304 на повторный опрос.
+
+    Ключ кеша и ETag строятся из версий scopes, которые поднимают
+    сигналы при сохранении записей, поэтому сбрасывать кеш не нужно.
+    """
+    @condition(**conditional_funcs(get_scopes, feed_etag,
+                                   feed_last_modified))
+    def view(request, *args, **kwargs):
+        scopes = request._conditional_scopes
+        if scopes is None:
+            return feed(request, *args, **kwargs)
+        key = (f'posts:syndication:{feed_origin(request)}:'
+               f'{feed_version(*scopes)}')
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = feed(request, *args, **kwargs)
+        # Last-Modified выставит condition по отметке scopes, как и для
+        # ответа из кеша.
+        del response['Last-Modified']
+        cache.set(key, (response.content, response['Content-Type']),
+                  settings.FEED_CACHE_TIMEOUT)
+        return response
+    return view
+
+
+index_rss = cached_feed(IndexFeed(), index_scopes)
+index_atom = cached_feed(AtomIndexFeed(), index_scopes)
+group_rss = cached_feed(GroupFeed(), group_list_scopes)
+group_atom = cached_feed(AtomGroupFeed(), group_list_scopes)
+profile_rss = cached_feed(AuthorFeed(), author_scopes)
+profile_atom = cached_feed(AtomAuthorFeed(), author_scopes)
@@ -0,0 +1,120 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow, User
+from .writer import perform
+
+# Беззнаковые 32-битные id: 4 байта на автора вместо pickle множества.
+ID_TYPECODE = 'I'
+
+
+def following_key(user_id):
+    return f'posts:following:{user_id}'
+
+
+def pack_ids(ids):
+    return array(ID_TYPECODE, sorted(ids)).tobytes()
+
+
+def unpack_ids(data):
+    ids = array(ID_TYPECODE)
+    ids.frombytes(data)
+    return ids
+
+
+def followed_author_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан user_id.
+
+    Хранится в кеше упакованным в байты и сбрасывается сигналами Follow.
+    Набор годится только для показа: записи решаются по строкам Follow.
+    """
+    key = following_key(user_id)
+    data = cache.get(key)
+    if data is None:
+        data = pack_ids(
+            Follow.objects.filter(
+                user_id=user_id
+            ).values_list('author_id', flat=True)
+        )
+        cache.set(key, data, settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+    return unpack_ids(data)
+
+
+def is_following(user, author):
+    if not user.is_authenticated or user.id == author.id:
+        return False
+    ids = followed_author_ids(user.id)
+    index = bisect_left(ids, author.id)
+    return index < len(ids) and ids[index] == author.id
+
+
+def invalidate_following(user_id):
+    """Сбрасывает подписки пользователя сейчас и после коммита.
+
+    Второй сброс убирает набор, который параллельный запрос успел
+    прочитать из базы до коммита подписки.
+    """
+    key = following_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def follow(user, author):
+    """Подписывает user на author; повторная подписка ничего не пишет.
+
+    Возвращает True, если подписка создана. Кешу подписок здесь не
+    верим: он может отставать, а дубль не даст создать unique_follow.
+    """
+    if user.id == author.id:
+        return False
+    return perform(Follow, lambda: Follow.objects.get_or_create(
+        user=user, author=author
+    )[1])
+
+
+def unfollow(user, author):
+    return perform(Follow, lambda: bool(
+        Follow.objects.filter(user=user, author=author).delete()[0]
+    ))
+
+
+def change_follows(user, follow_names=(), unfollow_names=()):
+    """Подписывает и отписывает user от авторов по спискам username.
+
+    Авторы и текущие подписки читаются один раз на весь список, подписки —
+    из строк Follow, а не из кеша. Вызывается внутри транзакции.
+    Возвращает словарь со списками followed, unfollowed, unchanged и missing.
+    """
+    names = {*follow_names, *unfollow_names}
+    authors = User.objects.only('id', 'username').in_bulk(
+        names, field_name='username'
+    )
+    followed = set(Follow.objects.filter(
+        user=user, author__in=authors.values()
+    ).values_list('author_id', flat=True))
+    result = {'followed': [], 'unfollowed': [], 'unchanged': [],
+              'missing': sorted(names - set(authors))}
+    for name in dict.fromkeys(follow_names):
+        author = authors.get(name)
+        if author is None:
+            continue
+        if author.id in followed or author.id == user.id:
+            result['unchanged'].append(name)
+            continue
+        _, created = Follow.objects.get_or_create(user=user, author=author)
+        followed.add(author.id)
+        result['followed' if created else 'unchanged'].append(name)
+    for name in dict.fromkeys(unfollow_names):
+        author = authors.get(name)
+        if author is None:
+            continue
+        if unfollow(user, author):
+            followed.discard(author.id)
+            result['unfollowed'].append(name)
+        else:
+            result['unchanged'].append(name)
+    return result
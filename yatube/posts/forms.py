@@ -1,6 +1,8 @@
 from django import forms
+from django.db import transaction
 
 from .models import Post, Comment
+from .thumbnails import schedule_thumbnails
 
 
 class PostForm(forms.ModelForm):
@@ -19,6 +21,16 @@ class PostForm(forms.ModelForm):
             'image': 'Прикрепите картинку',
         }
 
+    def save(self, commit=True):
+        post = super().save(commit=commit)
+        if 'image' in self.changed_data:
+            # Имя файла окончательно известно только после post.save(),
+            # а генерировать миниатюры нужно вне запроса.
+            transaction.on_commit(
+                lambda: post.image and schedule_thumbnails(post.image.name)
+            )
+        return post
+
 
 class CommentForm(forms.ModelForm):
 
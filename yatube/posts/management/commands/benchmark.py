@@ -0,0 +1,122 @@
+import json
+import os
+import platform
+import sqlite3
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from posts.benchmark import compare, run_benchmark
+from posts.models import Post
+from posts.seeding import seed_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет тестовую базу и замеряет задержки и запросы '
+        'каждого маршрута posts, сравнивая их с прошлым замером'
+    )
+
+    def add_arguments(self, parser):
+        sizes = (
+            ('users', 1000), ('groups', 20), ('posts', 20000),
+            ('follows', 5000), ('comments', 40000),
+        )
+        for name, default in sizes:
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Сколько строк {name} создать (по умолчанию {default})',
+            )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора данных',
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=30,
+            help='Сколько замеров сделать для каждой страницы',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько первых запросов не учитывать',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу и не заполнять её повторно',
+        )
+        parser.add_argument(
+            '--baseline', default=settings.BENCHMARK_BASELINE,
+            help='JSON с прошлым замером; в него же пишется новый',
+        )
+        parser.add_argument(
+            '--no-save', action='store_true',
+            help='Только сравнить с прошлым замером, не перезаписывая его',
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=None,
+            help='Завершиться с ошибкой, если p95 вырос больше, чем на N %%',
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 2:
+            raise CommandError('Для перцентилей нужно минимум два замера')
+        dataset = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'follows', 'comments',
+                         'seed')
+        }
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options['keepdb']
+        )
+        try:
+            if not (options['keepdb'] and Post.objects.exists()):
+                seed_database(**dataset)
+            results = run_benchmark(
+                options['iterations'], options['warmup'], options['cold']
+            )
+        finally:
+            teardown_databases(
+                old_config, verbosity=0, keepdb=options['keepdb']
+            )
+        previous = self.load(options['baseline'])
+        if previous and previous['dataset'] != dataset:
+            self.stdout.write(self.style.WARNING(
+                'Прошлый замер сделан на другом наборе данных'
+            ))
+        lines, regressions = compare(
+            previous['results'] if previous else {},
+            results,
+            options['max_regression'],
+        )
+        self.stdout.write('\n'.join(lines))
+        if not options['no_save']:
+            self.save(options['baseline'], {
+                'dataset': dataset,
+                'cold': options['cold'],
+                'environment': {
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                },
+                'results': results,
+            })
+        if regressions and options['max_regression'] is not None:
+            raise CommandError(f'Ухудшились: {", ".join(regressions)}')
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            return json.load(file)
+
+    def save(self, path, data):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
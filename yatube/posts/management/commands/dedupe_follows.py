@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from posts.counters import rebuild_user_counters
+from posts.follows import invalidate_following
+from posts.models import Follow
+from posts.timeline import rebuild_timelines
+
+
+def has_unique_follow(cursor):
+    constraints = connection.introspection.get_constraints(
+        cursor, Follow._meta.db_table
+    )
+    return any(
+        constraint['unique']
+        and set(constraint['columns']) == {'user_id', 'author_id'}
+        for constraint in constraints.values()
+    )
+
+
+def batches(ids, size):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет повторные подписки и добавляет уникальный индекс '
+        '(user, author) в базы, созданные до него'
+    )
+
+    def handle(self, *args, **options):
+        quote = connection.ops.quote_name
+        table = quote(Follow._meta.db_table)
+        with transaction.atomic():
+            pairs = Follow.objects.values('user_id', 'author_id').annotate(
+                total=Count('id')
+            ).filter(total__gt=1)
+            users = {pair['user_id'] for pair in pairs}
+            authors = {pair['author_id'] for pair in pairs}
+            with connection.cursor() as cursor:
+                # Сырой DELETE: сигналы Follow уменьшили бы счётчики и
+                # вычистили ленту, хотя одна подписка из пары остаётся.
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE id NOT IN ('
+                    f'SELECT MIN(id) FROM {table} '
+                    f'GROUP BY user_id, author_id)'
+                )
+                deleted = cursor.rowcount
+                added = not has_unique_follow(cursor)
+                if added:
+                    cursor.execute(
+                        f'CREATE UNIQUE INDEX {quote("unique_follow")} '
+                        f'ON {table} (user_id, author_id)'
+                    )
+            size = settings.TIMELINE_BATCH_SIZE
+            for batch in batches(users | authors, size):
+                rebuild_user_counters(batch)
+            for batch in batches(users, size):
+                rebuild_timelines(batch)
+                for user_id in batch:
+                    invalidate_following(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено повторных подписок: {deleted}, '
+            f'уникальный индекс {"добавлен" if added else "уже был"}'
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры картинок записей'
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        total = 0
+        for image_name in images.iterator():
+            generate_thumbnails(image_name)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {total}'
+        ))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, User
+from posts.timeline import rebuild_timelines, trim_timelines
+
+
+class Command(BaseCommand):
+    help = 'Заново собирает ленты подписок из таблицы подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пересобрать ленты только указанных пользователей',
+        )
+        parser.add_argument(
+            '--trim-only',
+            action='store_true',
+            help=(
+                'Только обрезать ленты до TIMELINE_MAX_LENGTH записей; '
+                'запускается периодически, новые записи лент не обрезают'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        user_ids = Follow.objects.values_list('user_id', flat=True).distinct()
+        if options['usernames']:
+            user_ids = User.objects.filter(
+                username__in=options['usernames']
+            ).values_list('id', flat=True)
+        user_ids = list(user_ids)
+        batch_size = settings.TIMELINE_BATCH_SIZE
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                if options['trim_only']:
+                    trim_timelines(batch)
+                else:
+                    rebuild_timelines(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано лент: {len(user_ids)}')
+        )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import rebuild_comments_counts, rebuild_user_counters
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики записей, подписок и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк пересчитывать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = self.reconcile(
+            User.objects.all(),
+            batch_size,
+            rebuild_user_counters,
+        )
+        posts = self.reconcile(
+            Post.objects.all(),
+            batch_size,
+            lambda ids: rebuild_comments_counts(
+                Post.objects.filter(pk__in=ids)
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {users}, записей: {posts}'
+        ))
+
+    def reconcile(self, queryset, batch_size, rebuild):
+        total = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                queryset.filter(
+                    pk__gt=last_pk
+                ).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            with transaction.atomic():
+                rebuild(ids)
+            total += len(ids)
+            last_pk = ids[-1]
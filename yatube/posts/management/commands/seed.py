@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import FOLLOW_EXPONENT, seed_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро заполняет базу пользователями, группами, записями, '
+        'подписками и комментариями'
+    )
+
+    def add_arguments(self, parser):
+        sizes = (
+            ('users', 1000), ('groups', 20), ('posts', 20000),
+            ('follows', 5000), ('comments', 40000),
+        )
+        for name, default in sizes:
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Сколько строк {name} создать (по умолчанию {default})',
+            )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора: одно зерно даёт одни и те же данные',
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.0,
+            help='Доля записей с картинкой, от 0 до 1',
+        )
+        parser.add_argument(
+            '--follow-exponent', type=float, default=FOLLOW_EXPONENT,
+            help='Показатель степенного закона популярности авторов',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['image_ratio'] <= 1:
+            raise CommandError('--image-ratio должен быть от 0 до 1')
+        stats = seed_database(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            follows=options['follows'],
+            comments=options['comments'],
+            seed=options['seed'],
+            image_ratio=options['image_ratio'],
+            follow_exponent=options['follow_exponent'],
+        )
+        for label, rows, seconds in stats:
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(
+                f'{label:<20} {rows:>10} строк {seconds:>8.2f} с '
+                f'{rate:>10.0f} строк/с'
+            )
+        total_rows = sum(rows for _, rows, _ in stats)
+        total_seconds = sum(seconds for _, _, seconds in stats)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {total_rows} за {total_seconds:.2f} с'
+        ))
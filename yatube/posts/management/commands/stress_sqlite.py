@@ -0,0 +1,209 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from posts.models import Comment, Group, Post, User
+from posts.search import install_search_index
+from posts.writer import WriteQueue
+
+PROFILES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3'},
+    'production': settings.SQLITE_PRODUCTION_PROFILE,
+}
+POSTS_PER_USER = 20
+QUEUE_MODES = {'off': (False,), 'on': (True,), 'both': (False, True)}
+
+
+class Stress:
+    """Параллельные записи и чтения одной временной базы SQLite."""
+
+    def __init__(self, alias, writers, readers, seconds, write_queue=False):
+        self.alias = alias
+        self.queue = write_queue and WriteQueue(
+            alias, settings.WRITE_BATCH_SIZE, settings.WRITE_BATCH_WAIT
+        )
+        self.writers = writers
+        self.readers = readers
+        self.seconds = seconds
+        self.latencies = []
+        self.errors = []
+        self.reads = []
+
+    def prepare(self):
+        connection = connections[self.alias]
+        with connection.schema_editor() as editor:
+            for model in (User, Group, Post, Comment):
+                editor.create_model(model)
+        install_search_index(connection)
+        User.objects.using(self.alias).bulk_create(
+            User(username=f'stress{index}') for index in range(self.writers)
+        )
+        users = list(User.objects.using(self.alias).all())
+        Post.objects.using(self.alias).bulk_create(
+            Post(text=f'Запись {index}', author=user)
+            for user in users for index in range(POSTS_PER_USER)
+        )
+        self.user_ids = [user.id for user in users]
+        self.post_ids = list(
+            Post.objects.using(self.alias).values_list('id', flat=True)
+        )
+        connection.close()
+
+    def write(self, rng):
+        # Как add_comment и profile_follow: чтение, затем запись.
+        posts = Post.objects.using(self.alias)
+        post = posts.only('id').get(pk=rng.choice(self.post_ids))
+        author_id = rng.choice(self.user_ids)
+        comment = rng.random() < 0.5
+        if self.queue:
+            self.queue.submit(
+                lambda: self.insert(post, author_id, comment)
+            ).result(settings.WRITE_TIMEOUT)
+            return
+        with transaction.atomic(using=self.alias):
+            self.insert(post, author_id, comment)
+
+    def insert(self, post, author_id, comment):
+        posts = Post.objects.using(self.alias)
+        if comment:
+            Comment.objects.using(self.alias).bulk_create([Comment(
+                post=post, author_id=author_id, text='Комментарий'
+            )])
+            posts.filter(pk=post.pk).update(
+                comments_count=F('comments_count') + 1
+            )
+        else:
+            posts.bulk_create([Post(text='Запись', author_id=author_id)])
+
+    def read(self, rng):
+        list(
+            Post.objects.using(self.alias).select_related(
+                'author', 'group'
+            ).order_by('-pub_date')[:settings.NUMBER_OF_LAST_RECORDS]
+        )
+
+    def loop(self, seed, action, done):
+        rng = random.Random(seed)
+        connection = connections[self.alias]
+        deadline = time.perf_counter() + self.seconds
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    action(rng)
+                except OperationalError as error:
+                    self.errors.append(str(error))
+                else:
+                    done.append(time.perf_counter() - started)
+                # Граница запроса: без CONN_MAX_AGE соединение закрывается.
+                connection.close_if_unusable_or_obsolete()
+        finally:
+            connection.close()
+
+    def run(self):
+        threads = [
+            threading.Thread(
+                target=self.loop, args=(index, self.write, self.latencies)
+            )
+            for index in range(self.writers)
+        ] + [
+            threading.Thread(
+                target=self.loop, args=(-index - 1, self.read, self.reads)
+            )
+            for index in range(self.readers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.queue:
+            self.queue.stop()
+
+    def summary(self):
+        cuts = (
+            statistics.quantiles(self.latencies, n=100, method='inclusive')
+            if len(self.latencies) > 1 else [0.0] * 99
+        )
+        return {
+            'writes_per_second': len(self.latencies) / self.seconds,
+            'reads_per_second': len(self.reads) / self.seconds,
+            'errors': len(self.errors),
+            'p50_ms': cuts[49] * 1000,
+            'p95_ms': cuts[94] * 1000,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает временную базу SQLite параллельными записями и '
+        'чтениями и сравнивает обычный и боевой профили'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', choices=sorted(PROFILES), action='append',
+            help='Какие профили проверить (по умолчанию все)',
+        )
+        parser.add_argument(
+            '--writers', type=int, default=8,
+            help='Сколько потоков пишут комментарии и записи',
+        )
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Сколько потоков читают главную ленту',
+        )
+        parser.add_argument(
+            '--write-queue', choices=('off', 'on', 'both'), default='both',
+            help='Писать через поток-писатель, напрямую или сравнить оба',
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=5.0,
+            help='Сколько секунд длится нагрузка на профиль',
+        )
+
+    def handle(self, *args, **options):
+        queue_modes = QUEUE_MODES[options['write_queue']]
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profile'] or sorted(PROFILES):
+                for write_queue in queue_modes:
+                    name = f'{profile}+queue' if write_queue else profile
+                    self.report(name, self.stress(
+                        directory, name, PROFILES[profile], write_queue,
+                        options,
+                    ))
+
+    def stress(self, directory, name, profile, write_queue, options):
+        alias = f'stress_{name}'
+        connections.databases[alias] = {
+            **profile,
+            'NAME': os.path.join(directory, f'{name}.sqlite3'),
+        }
+        stress = Stress(alias, options['writers'], options['readers'],
+                        options['seconds'], write_queue)
+        try:
+            stress.prepare()
+            stress.run()
+        finally:
+            connections[alias].close()
+            del connections.databases[alias]
+        return stress
+
+    def report(self, profile, stress):
+        result = stress.summary()
+        self.stdout.write(
+            f'{profile:<17} записей/с {result["writes_per_second"]:>8.1f}  '
+            f'чтений/с {result["reads_per_second"]:>8.1f}  '
+            f'p50 {result["p50_ms"]:>7.1f} мс  '
+            f'p95 {result["p95_ms"]:>7.1f} мс  '
+            f'ошибок {result["errors"]}'
+        )
+        for error in sorted(set(stress.errors)):
+            self.stdout.write(f'  {error}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.counts import update_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает статистику ANALYZE, по которой оцениваются количества '
+        'строк больших таблиц; запускать после загрузки данных'
+    )
+
+    def handle(self, *args, **options):
+        update_statistics(connection)
+        self.stdout.write(self.style.SUCCESS('Статистика обновлена'))
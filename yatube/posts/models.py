@@ -34,6 +34,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         blank=False,
@@ -54,15 +58,51 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('pub_date',),
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('updated_at',),
+                name='post_updated_at_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.text[:settings.MAX_POST_SELF_TEXT_LENGTH]
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        # comments_count меняется только через F() в change_comments_count:
+        # сохранение всей записи вернуло бы в базу прочитанное раньше
+        # значение и потеряло бы параллельно добавленный комментарий.
+        if update_fields is None and not self._state.adding and not (
+                force_insert):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -91,6 +131,12 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.text[:settings.MAX_COMMENT_SELF_TEXT_LENGTH]
@@ -116,8 +162,91 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+        )
 
     def __str__(self) -> str:
         return ('Подписки '
                 + self.user.username
                 )[:settings.MAX_FOLLOW_SELF_TEXT_LENGTH]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Запись'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        'Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-pub_date', '-post_id')
+        indexes = (
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx',
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user_id} <- {self.post_id}'
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество записей',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self) -> str:
+        return f'Счётчики {self.user_id}'
@@ -0,0 +1,208 @@
+import math
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+from .utils import CursorPage, decode_token, encode_token, is_db_int
+
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+# Индексируемая модель -> имя виртуальной таблицы FTS5.
+SEARCH_TABLES = {
+    Post: 'posts_post_fts',
+    Comment: 'posts_comment_fts',
+}
+
+
+# Значения kind в выдаче и в курсоре
+SEARCH_KINDS = ('comment', 'post')
+
+
+def fts_table(model):
+    return SEARCH_TABLES[model]
+
+
+def decode_search_cursor(token):
+    """Тройка [rank, kind, id] из токена или None, если он испорчен."""
+    try:
+        rank, kind, pk = decode_token(token)
+    except (TypeError, ValueError):
+        return None
+    rank_valid = is_db_int(rank) or (
+        isinstance(rank, float) and math.isfinite(rank)
+    )
+    if not rank_valid or kind not in SEARCH_KINDS or not is_db_int(pk):
+        return None
+    return [rank, kind, pk]
+
+
+def search_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options
+
+
+def search_index_ready(connection):
+    """FTS5 поддерживается, и таблицы индекса уже созданы."""
+    if not search_available(connection):
+        return False
+    existing = set(connection.introspection.table_names())
+    return set(SEARCH_TABLES.values()) <= existing
+
+
+def install_search_index(connection):
+    """Создаёт таблицы FTS5 и триггеры, которые держат их в синхронизации."""
+    if not search_available(connection):
+        return
+    existing = set(connection.introspection.table_names())
+    with connection.cursor() as cursor:
+        for model, fts in SEARCH_TABLES.items():
+            table = model._meta.db_table
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5('
+                f"text, content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_insert '
+                f'AFTER INSERT ON {table} BEGIN '
+                f'INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); '
+                f'END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_delete '
+                f'AFTER DELETE ON {table} BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, text) "
+                f"VALUES ('delete', old.id, old.text); "
+                f'END'
+            )
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {fts}_update '
+                f'AFTER UPDATE OF text ON {table} BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, text) "
+                f"VALUES ('delete', old.id, old.text); "
+                f'INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); '
+                f'END'
+            )
+            if fts not in existing:
+                cursor.execute(
+                    f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+                )
+
+
+def match_expression(query):
+    """Строка поиска пользователя как безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки, поэтому синтаксис FTS5 (OR, NEAR,
+    звёздочки) из запроса не исполняется; слова объединяются через AND.
+    """
+    words = query.split()
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def matching_ids(model, query):
+    """Подзапрос id объектов модели, подходящих под поисковую строку."""
+    fts = fts_table(model)
+    return RawSQL(
+        f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s',
+        (match_expression(query),),
+    )
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    id: int
+    post_id: int
+    snippet: str
+    rank: float
+    post: Post = None
+
+
+class SearchPaginator:
+    """Ранжированная выдача по записям и комментариям с курсором.
+
+    Курсор — тройка (rank, kind, id) последнего результата, следующая
+    страница берётся условием на row value без OFFSET.
+    """
+
+    def __init__(self, query, per_page, using=None):
+        self.query = query
+        self.per_page = per_page
+        self.using = using or router.db_for_read(Post)
+
+    @cached_property
+    def available(self):
+        return search_index_ready(connections[self.using])
+
+    def cursor_for(self, result):
+        return encode_token([result.rank, result.kind, result.id])
+
+    def fetch(self, after):
+        post_fts = fts_table(Post)
+        comment_fts = fts_table(Comment)
+        comment_table = Comment._meta.db_table
+        snippet = (
+            "snippet({table}, 0, '" + MARK_START + "', '" + MARK_END
+            + "', '…', %s)"
+        )
+        expression = match_expression(self.query)
+        length = settings.SEARCH_SNIPPET_TOKENS
+        sql = (
+            f"SELECT kind, id, post_id, snippet, rank FROM ("
+            f"  SELECT 'post' AS kind, rowid AS id, rowid AS post_id,"
+            f"    {snippet.format(table=post_fts)} AS snippet,"
+            f"    bm25({post_fts}) AS rank"
+            f"  FROM {post_fts} WHERE {post_fts} MATCH %s"
+            f"  UNION ALL"
+            f"  SELECT 'comment', {comment_fts}.rowid, c.post_id,"
+            f"    {snippet.format(table=comment_fts)},"
+            f"    bm25({comment_fts})"
+            f"  FROM {comment_fts}"
+            f"  JOIN {comment_table} c ON c.id = {comment_fts}.rowid"
+            f"  WHERE {comment_fts} MATCH %s"
+            f")"
+        )
+        params = [length, expression, length, expression]
+        if after:
+            sql += ' WHERE (rank, kind, id) > (%s, %s, %s)'
+            params += after
+        sql += ' ORDER BY rank, kind, id LIMIT %s'
+        params.append(self.per_page + 1)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return [
+                SearchResult(kind, pk, post_id, highlight(text), rank)
+                for kind, pk, post_id, text, rank in cursor.fetchall()
+            ]
+
+    def get_page(self, after=None):
+        after = after and decode_search_cursor(after)
+        results = []
+        if match_expression(self.query) and self.available:
+            results = self.fetch(after)
+        posts = Post.objects.using(self.using).select_related(
+            'author', 'group'
+        ).in_bulk({result.post_id for result in results})
+        for result in results:
+            result.post = posts.get(result.post_id)
+        has_next = len(results) > self.per_page
+        return CursorPage(results[:self.per_page], self, has_next, False)
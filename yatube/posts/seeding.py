@@ -0,0 +1,271 @@
+import bisect
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from .counts import update_statistics
+from .models import Comment, Follow, Group, Post, User
+
+# Ограничение SQLite на число параметров в одном запросе.
+MAX_QUERY_PARAMS = 999
+SEED_START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+SEED_DAYS = 365
+IMAGE_VARIANTS = 8
+# Популярность автора убывает как 1 / ранг ** FOLLOW_EXPONENT.
+FOLLOW_EXPONENT = 1.1
+
+RELAXED_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',
+}
+
+
+def vocabulary(seed, size=2000):
+    """Словарь для текстов: Faker вызывается один раз, а не на строку."""
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    return fake.words(nb=size)
+
+
+def sentence(rng, words, low=5, high=40):
+    return ' '.join(rng.choices(words, k=rng.randint(low, high))).capitalize()
+
+
+@contextmanager
+def relaxed_pragmas():
+    """Отключает синхронную запись SQLite на время массовой вставки.
+
+    Внутри транзакции SQLite не меняет эти настройки, поэтому там
+    менеджер ничего не делает.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        saved = {}
+        for name, value in RELAXED_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}')
+            saved[name] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in saved.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def insert_rows(model, columns, rows, ignore_conflicts=False):
+    """Вставляет строки многострочными INSERT, минуя модели.
+
+    В один запрос попадает столько строк, сколько позволяет лимит
+    параметров базы. Возвращает число вставленных строк.
+    """
+    ops = connection.ops
+    table = ops.quote_name(model._meta.db_table)
+    names = ', '.join(ops.quote_name(column) for column in columns)
+    limit = connection.features.max_query_params or MAX_QUERY_PARAMS
+    per_query = max(1, limit // len(columns))
+    row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    statement = ops.insert_statement(ignore_conflicts=ignore_conflicts)
+    suffix = ops.ignore_conflicts_suffix_sql(ignore_conflicts=ignore_conflicts)
+    total = 0
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, per_query))
+            if not batch:
+                return total
+            cursor.execute(
+                f'{statement} {table} ({names}) VALUES '
+                + ', '.join([row_sql] * len(batch)) + f' {suffix}',
+                [value for row in batch for value in row],
+            )
+            total += (
+                cursor.rowcount if cursor.rowcount >= 0 else len(batch)
+            )
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def power_law(size, exponent):
+    """Накопленные веса рангов 1..size: вес ранга 1 / ранг ** exponent."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def pick(rng, cum_weights):
+    # Выбор индекса по накопленным весам за O(log n).
+    return bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+
+
+def seed_images(seed, count):
+    """Несколько картинок, общих для всех записей с картинкой."""
+    rng = random.Random(seed)
+    names = []
+    for index in range(count):
+        name = f'posts/seed-{seed}-{index}.png'
+        if not default_storage.exists(name):
+            color = tuple(rng.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (960, 540), color).save(buffer, 'PNG')
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        names.append(name)
+    return names
+
+
+class Dataset:
+    """Параметры набора и общий генератор случайных чисел."""
+
+    def __init__(self, users, groups, posts, follows, comments, seed,
+                 image_ratio, follow_exponent):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.follows = follows
+        self.comments = comments
+        self.image_ratio = image_ratio
+        self.rng = random.Random(seed)
+        self.words = vocabulary(seed)
+        self.adapt = connection.ops.adapt_datetimefield_value
+        self.images = seed_images(seed, IMAGE_VARIANTS) if image_ratio else []
+        self.step = timedelta(days=SEED_DAYS) / max(posts, 1)
+        self.first_user = next_id(User)
+        self.first_group = next_id(Group)
+        self.first_post = next_id(Post)
+        self.popularity = power_law(users, follow_exponent)
+
+    def user_rows(self):
+        password = make_password(None)
+        joined = self.adapt(SEED_START)
+        for index in range(self.users):
+            user_id = self.first_user + index
+            yield (
+                user_id, f'user{user_id}', password,
+                '', '', '', False, True, False, joined,
+            )
+
+    def group_rows(self):
+        rng, words = self.rng, self.words
+        for index in range(self.groups):
+            yield (
+                self.first_group + index,
+                sentence(rng, words, 1, 3)[:200],
+                f'group-{self.first_group + index}',
+                sentence(rng, words),
+            )
+
+    def post_rows(self):
+        rng = self.rng
+        for index in range(self.posts if self.users else 0):
+            pub_date = self.adapt(
+                SEED_START + self.step * (index + rng.random())
+            )
+            group = rng.randrange(self.groups + 1)
+            has_image = rng.random() < self.image_ratio
+            yield (
+                self.first_post + index,
+                sentence(rng, self.words),
+                pub_date,
+                pub_date,
+                self.first_user + pick(rng, self.popularity),
+                self.first_group + group if group < self.groups else None,
+                rng.choice(self.images) if has_image else '',
+                0,
+            )
+
+    def follow_rows(self):
+        rng = self.rng
+        for _ in range(self.follows if self.users > 1 else 0):
+            user = rng.randrange(self.users)
+            author = pick(rng, self.popularity)
+            if author != user:
+                yield self.first_user + user, self.first_user + author
+
+    def comment_rows(self):
+        rng = self.rng
+        for _ in range(self.comments if self.posts and self.users else 0):
+            index = rng.randrange(self.posts)
+            created = SEED_START + self.step * index + timedelta(
+                seconds=rng.uniform(0, 7 * 24 * 3600)
+            )
+            yield (
+                self.first_post + index,
+                self.first_user + rng.randrange(self.users),
+                sentence(rng, self.words, 3, 20),
+                self.adapt(created),
+            )
+
+
+def timed(stats, label, insert):
+    started = time.perf_counter()
+    with transaction.atomic():
+        count = insert()
+    stats.append((label, count, time.perf_counter() - started))
+
+
+def seed_database(users, groups, posts, follows, comments, seed=0,
+                  image_ratio=0.0, follow_exponent=FOLLOW_EXPONENT):
+    """Заполняет базу детерминированным набором данных заданного размера.
+
+    Строки вставляются сырыми многострочными INSERT, поэтому сигналы не
+    работают: счётчики и ленты подписок после вставки пересчитываются
+    командами, а для оценок количества собирается статистика ANALYZE.
+    Авторы записей и подписок выбираются по степенному закону.
+    Возвращает [(таблица, строк, секунд)].
+    """
+    data = Dataset(users, groups, posts, follows, comments, seed,
+                   image_ratio, follow_exponent)
+    stats = []
+    with relaxed_pragmas():
+        timed(stats, User._meta.db_table, lambda: insert_rows(
+            User,
+            ('id', 'username', 'password', 'first_name', 'last_name',
+             'email', 'is_staff', 'is_active', 'is_superuser',
+             'date_joined'),
+            data.user_rows(),
+        ))
+        timed(stats, Group._meta.db_table, lambda: insert_rows(
+            Group, ('id', 'title', 'slug', 'description'), data.group_rows(),
+        ))
+        timed(stats, Post._meta.db_table, lambda: insert_rows(
+            Post,
+            ('id', 'text', 'pub_date', 'updated_at', 'author_id',
+             'group_id', 'image', 'comments_count'),
+            data.post_rows(),
+        ))
+        timed(stats, Follow._meta.db_table, lambda: insert_rows(
+            Follow, ('user_id', 'author_id'), data.follow_rows(),
+            ignore_conflicts=True,
+        ))
+        timed(stats, Comment._meta.db_table, lambda: insert_rows(
+            Comment, ('post_id', 'author_id', 'text', 'created'),
+            data.comment_rows(),
+        ))
+        timed(stats, 'counters', lambda: call_command(
+            'reconcile_counters', stdout=StringIO()
+        ) or 0)
+        timed(stats, 'timelines', lambda: call_command(
+            'rebuild_timelines', stdout=StringIO()
+        ) or 0)
+        timed(stats, 'statistics',
+              lambda: update_statistics(connection) or 0)
+    return stats
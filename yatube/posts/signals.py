@@ -0,0 +1,115 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caches import (GLOBAL_SCOPE, bump_feed_versions, follows_scope,
+                     group_scope, post_scope, post_scopes, profile_scope)
+from .counters import change_comments_count, change_user_counter
+from .counts import invalidate_counts
+from .follows import invalidate_following
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .timeline import backfill_timeline, drop_from_timeline, fan_out_post
+
+
+USER_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk is not None:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    scopes = post_scopes(instance)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id and previous_group_id != instance.group_id:
+        scopes.append(group_scope(previous_group_id))
+    bump_feed_versions(*scopes)
+    if created:
+        change_user_counter(instance.author_id, 'posts_count', 1)
+        fan_out_post(instance)
+        invalidate_counts(Post, TimelineEntry)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_feed_versions(*post_scopes(instance))
+    change_user_counter(instance.author_id, 'posts_count', -1)
+    invalidate_counts(Post, TimelineEntry)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        bump_feed_versions(GLOBAL_SCOPE)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields, **kwargs):
+    instance._previous_card = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not USER_CARD_FIELDS & update_fields:
+        return
+    instance._previous_card = User.objects.filter(
+        pk=instance.pk
+    ).values(*USER_CARD_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Смена пароля или last_login карточки не меняет.
+    previous = getattr(instance, '_previous_card', None)
+    if created or previous is None:
+        return
+    if any(previous[field] != getattr(instance, field)
+           for field in USER_CARD_FIELDS):
+        bump_feed_versions(GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    bump_feed_versions(post_scope(instance.post_id))
+    if created:
+        change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump_feed_versions(post_scope(instance.post_id))
+    change_comments_count(instance.post_id, -1)
+
+
+def follow_scopes(follow):
+    # Число подписчиков видно в профиле автора, число подписок —
+    # в профиле подписчика.
+    return (
+        profile_scope(follow.author_id),
+        profile_scope(follow.user_id),
+        follows_scope(follow.user_id),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    bump_feed_versions(*follow_scopes(instance))
+    invalidate_following(instance.user_id)
+    if created:
+        change_user_counter(instance.author_id, 'followers_count', 1)
+        change_user_counter(instance.user_id, 'following_count', 1)
+        backfill_timeline(instance.user_id, instance.author_id)
+        invalidate_counts(TimelineEntry)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    bump_feed_versions(*follow_scopes(instance))
+    invalidate_following(instance.user_id)
+    change_user_counter(instance.author_id, 'followers_count', -1)
+    change_user_counter(instance.user_id, 'following_count', -1)
+    drop_from_timeline(instance.user_id, instance.author_id)
+    invalidate_counts(TimelineEntry)
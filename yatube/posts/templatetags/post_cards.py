@@ -0,0 +1,27 @@
+from django import template
+
+from posts import cards
+from posts.utils import encode_cursor
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_cards(posts, **flags):
+    """Берёт карточки записей страницы из кеша, недостающие рисует."""
+    cards.prefetch_cards(posts, **flags)
+    return ''
+
+
+@register.simple_tag
+def cards_cursor(page_obj):
+    """Курсор для следующих карточек после страницы любого вида.
+
+    Пустая строка, если дальше записей нет.
+    """
+    if not page_obj or not page_obj.has_next():
+        return ''
+    if getattr(page_obj, 'next_cursor', None):
+        return page_obj.next_cursor
+    post = page_obj[len(page_obj) - 1]
+    return encode_cursor((post.pub_date, post.id))
@@ -0,0 +1,27 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, name):
+    """Загружает миниатюры всех записей страницы одним обращением."""
+    thumbnails.prefetch_thumbnails(posts, name)
+    return ''
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post, name, css_class=''):
+    """<picture> с вариантами миниатюры или исходная картинка записи."""
+    prefetched = getattr(post, 'thumbnails', {})
+    if name in prefetched:
+        picture = prefetched[name]
+    else:
+        picture = thumbnails.ready_thumbnail(post.image, name)
+    return {
+        'picture': picture,
+        'image': post.image,
+        'css_class': css_class,
+    }
@@ -0,0 +1,146 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from users.forms import User
+
+POSTS_COUNT = 13
+
+
+class FeedApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        start = timezone.now() - timedelta(days=1)
+        for i in range(POSTS_COUNT):
+            post = Post.objects.create(
+                text=f'Пост №{i}',
+                author=cls.author,
+                group=None if i % 2 else cls.group,
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=start + timedelta(minutes=i)
+            )
+        cls.post = Post.objects.get(pk=post.pk)
+        for i in range(settings.COMMENTS_PER_PAGE + 1):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий №{i}'
+            )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed_ids(self, url):
+        ids = []
+        data = self.reader_client.get(url).json()
+        ids += [post['id'] for post in data['results']]
+        while data['next']:
+            data = self.reader_client.get(url, {'after': data['next']}).json()
+            ids += [post['id'] for post in data['results']]
+        return ids
+
+    def test_feeds_walk_every_post_by_cursor(self):
+        """Check if following next cursors lists each feed exactly once"""
+        posts = Post.objects.order_by('-pub_date', '-id')
+        feeds = {
+            'posts:api_index': ({}, posts),
+            'posts:api_group_list': (
+                {'group_name': self.group.slug}, posts.filter(group=self.group)
+            ),
+            'posts:api_profile': (
+                {'username': self.author.username}, posts
+            ),
+            'posts:api_follow_index': ({}, posts),
+        }
+        for name, (kwargs, expected) in feeds.items():
+            with self.subTest(feed=name):
+                self.assertEqual(
+                    self.feed_ids(reverse(name, kwargs=kwargs)),
+                    list(expected.values_list('id', flat=True)),
+                )
+
+    def test_feed_serializes_rows_without_models(self):
+        """Check if feeds are built from value rows, not model instances"""
+        with mock.patch.object(Post, 'from_db', side_effect=AssertionError):
+            data = self.reader_client.get(reverse('posts:api_index')).json()
+        self.assertEqual(len(data['results']), settings.NUMBER_OF_LAST_RECORDS)
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.post.id)
+        self.assertEqual(first['text'], self.post.text)
+        self.assertEqual(first['author'], self.author.username)
+        self.assertEqual(first['group'], self.group.slug)
+        self.assertIsNone(data['previous'])
+
+    def test_follow_feed_needs_login(self):
+        """Check if an anonymous follow feed request gets 401, not a page"""
+        response = self.client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_post_detail_pages_comments(self):
+        """Check if a post comes with a page of comments and a cursor"""
+        url = reverse('posts:api_post_detail',
+                      kwargs={'post_id': self.post.id})
+        data = self.reader_client.get(url).json()
+        self.assertEqual(data['id'], self.post.id)
+        self.assertEqual(
+            data['comments_count'], settings.COMMENTS_PER_PAGE + 1
+        )
+        comments = data['comments']
+        self.assertEqual(len(comments['results']), settings.COMMENTS_PER_PAGE)
+        rest = self.reader_client.get(
+            url, {'comments_after': comments['next']}
+        ).json()['comments']
+        self.assertEqual(len(rest['results']), 1)
+        self.assertIsNone(rest['next'])
+        missing = self.reader_client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(missing.status_code, 404)
+
+    def test_missing_objects_answer_json_not_found(self):
+        """Check if every API endpoint answers 404 in the JSON format"""
+        for name, kwargs in (
+            ('posts:api_group_list', {'group_name': 'missing'}),
+            ('posts:api_profile', {'username': 'missing'}),
+            ('posts:api_post_detail', {'post_id': 0}),
+            ('posts:api_post_detail', {'post_id': 2 ** 70}),
+        ):
+            with self.subTest(name=name, kwargs=kwargs):
+                response = self.reader_client.get(reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('error', response.json())
+
+    def test_posts_by_ids_keep_requested_order(self):
+        """Check if the multi-get answers in request order without gaps"""
+        ids = [self.post.id, 0, self.post.id - 2]
+        response = self.reader_client.get(
+            reverse('posts:api_posts'),
+            {'ids': ','.join(map(str, ids))},
+        )
+        self.assertEqual(
+            [post['id'] for post in response.json()['results']],
+            [self.post.id, self.post.id - 2],
+        )
+        for ids in ('1,x', str(2 ** 70), f'1,-{2 ** 63 + 1}',
+                    ','.join(['1'] * (settings.API_MAX_IDS + 1))):
+            with self.subTest(ids=ids[:10]):
+                response = self.reader_client.get(
+                    reverse('posts:api_posts'), {'ids': ids}
+                )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from posts.benchmark import compare, run_benchmark
+from posts.counts import estimate_count
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.seeding import seed_database
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedDatabaseTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def dataset(self):
+        first_user = User.objects.order_by('pk').first().pk
+        return [
+            (text, author_id - first_user, image)
+            for text, author_id, image in Post.objects.order_by(
+                'pk'
+            ).values_list('text', 'author_id', 'image')
+        ]
+
+    def test_seeding_is_deterministic(self):
+        """Check if the same seed gives the same dataset"""
+        seed_database(users=5, groups=2, posts=20, follows=6, comments=30,
+                      image_ratio=0.5)
+        first = self.dataset()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        seed_database(users=5, groups=2, posts=20, follows=6, comments=30,
+                      image_ratio=0.5)
+        self.assertEqual(self.dataset(), first)
+        self.assertTrue(any(image for _, _, image in first))
+
+    def test_popular_authors_get_most_followers(self):
+        """Check if the follow graph is skewed towards the first authors"""
+        seed_database(users=200, groups=0, posts=0, follows=2000,
+                      comments=0)
+        followers = list(
+            User.objects.order_by('pk').values_list(
+                'counters__followers_count', flat=True
+            )
+        )
+        self.assertGreater(sum(followers[:10]), sum(followers[100:]))
+
+    def test_seeding_fills_derived_tables(self):
+        """Check if counters and timelines are rebuilt after seeding"""
+        seed_database(users=5, groups=2, posts=20, follows=6, comments=30)
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 30)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            follow.author.counters.followers_count,
+            Follow.objects.filter(author=follow.author).count(),
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(
+                author__following__user=follow.user
+            ).count(),
+        )
+        with override_settings(COUNT_ESTIMATE_THRESHOLD=20):
+            self.assertEqual(estimate_count(Post.objects.all()), 20)
+
+    def test_seed_command_reports_rates(self):
+        """Check if the seed command prints rows per second per table"""
+        output = StringIO()
+        call_command('seed', users=3, groups=1, posts=4, follows=2,
+                     comments=5, stdout=output)
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertIn('posts_post', output.getvalue())
+        self.assertIn('строк/с', output.getvalue())
+
+
+class BenchmarkTest(TestCase):
+    def test_every_route_is_measured_for_both_clients(self):
+        """Check if the benchmark measures every posts view twice"""
+        seed_database(users=5, groups=2, posts=20, follows=6, comments=30)
+        results = run_benchmark(iterations=2)
+        self.assertIn('index:anonymous', results)
+        self.assertIn('follow_index:authorized', results)
+        for result in results.values():
+            self.assertEqual(
+                set(result), {'p50_ms', 'p95_ms', 'p99_ms', 'queries'}
+            )
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_compare_reports_regressions(self):
+        """Check if slower pages and extra queries count as regressions"""
+        previous = {
+            'index:anonymous': {
+                'p50_ms': 5, 'p95_ms': 10, 'p99_ms': 12, 'queries': 2,
+            },
+            'profile:anonymous': {
+                'p50_ms': 5, 'p95_ms': 10, 'p99_ms': 12, 'queries': 2,
+            },
+        }
+        current = {
+            'index:anonymous': {
+                'p50_ms': 6, 'p95_ms': 15, 'p99_ms': 16, 'queries': 2,
+            },
+            'profile:anonymous': {
+                'p50_ms': 5, 'p95_ms': 10, 'p99_ms': 12, 'queries': 3,
+            },
+            'search:anonymous': {
+                'p50_ms': 5, 'p95_ms': 10, 'p99_ms': 12, 'queries': 2,
+            },
+        }
+        lines, regressions = compare(previous, current, max_regression=20)
+        self.assertEqual(len(lines), 3)
+        self.assertIn('+50.0%', lines[0])
+        self.assertEqual(
+            regressions, ['index:anonymous', 'profile:anonymous']
+        )
+
+
+class StressSqliteTest(SimpleTestCase):
+    def test_stress_reports_every_profile(self):
+        """Check if only direct writes without the profile hit locks"""
+        out = StringIO()
+        call_command('stress_sqlite', writers=2, readers=1, seconds=0.3,
+                     stdout=out)
+        rows = {
+            line.split()[0]: line
+            for line in out.getvalue().splitlines()
+            if not line.startswith(' ')
+        }
+        self.assertEqual(
+            set(rows),
+            {'default', 'default+queue', 'production', 'production+queue'},
+        )
+        for name in ('default+queue', 'production', 'production+queue'):
+            with self.subTest(profile=name):
+                self.assertTrue(rows[name].endswith('ошибок 0'))
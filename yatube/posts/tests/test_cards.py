@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.loader import render_to_string
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from users.forms import User
+
+POSTS_COUNT = 3
+
+
+class CardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        for i in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                text=f'Пост №{i}', author=cls.author, group=cls.group
+            )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+
+    def renders(self):
+        return mock.patch('posts.cards.render_to_string',
+                          wraps=render_to_string)
+
+    def test_posts_new_post_renders_only_its_card(self):
+        """Check if a page after a new post renders just the new card"""
+        with self.renders() as render:
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(render.call_count, POSTS_COUNT)
+        Post.objects.create(text='Новый пост', author=self.author)
+        with self.renders() as render:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(render.call_count, 1)
+        self.assertContains(response, 'Новый пост')
+        self.assertContains(response, 'Пост №0')
+
+    def test_posts_comments_keep_the_card(self):
+        """Check if new and deleted comments do not re-render the card"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        comment.delete()
+        Post.objects.create(text='Новый пост', author=self.author)
+        with self.renders() as render:
+            self.client.get(url)
+        self.assertEqual(render.call_count, 1)
+
+    def test_posts_card_changes_with_post_group_and_author(self):
+        """Check if a cached card shows edits of the post, group, author"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Изменённый пост'
+        post.save()
+        self.assertContains(self.client.get(url), 'Изменённый пост')
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название группы'
+        group.save()
+        self.assertContains(self.client.get(url), '#Новое название группы')
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Другое'
+        author.save()
+        self.assertContains(self.client.get(url), 'Другое Фамилия')
+
+    def test_posts_card_changes_made_in_another_process(self):
+        """Check if cached cards show edits saved by another process"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        group = Group.objects.get(pk=self.group.pk)
+        author = User.objects.get(pk=self.author.pk)
+        post.text = 'Изменённый пост'
+        group.title = 'Новое название группы'
+        author.first_name = 'Другое'
+        # У другого процесса свой кеш 'default', общий только кеш версий.
+        with mock.patch.dict(caches._caches.caches,
+                             {'default': LocMemCache('other', {})}):
+            post.save()
+            group.save()
+            author.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Изменённый пост')
+        self.assertContains(response, '#Новое название группы')
+        self.assertContains(response, 'Другое Фамилия')
+
+    def test_posts_cards_differ_between_pages(self):
+        """Check if a card cached for one feed is not reused on another"""
+        profile_link = reverse('posts:profile',
+                               kwargs={'username': self.author.username})
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            profile_link)
+        response = self.client.get(profile_link)
+        self.assertNotContains(response, f'<a href="{profile_link}">')
+        self.assertContains(response, f'#{self.group.title}')
+        response = self.client.get(
+            reverse('posts:group_list',
+                    kwargs={'group_name': self.group.slug})
+        )
+        self.assertNotContains(response, f'#{self.group.title}')
@@ -0,0 +1,159 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.checks import check_versions_cache
+from posts.models import Comment, Follow, Group, Post
+from users.forms import User
+
+
+def other_process():
+    # Другой процесс: свой кеш 'default' и общий кеш версий.
+    return mock.patch.dict(
+        caches._caches.caches, {'default': LocMemCache('other', {})}
+    )
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.test_group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        cls.test_post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user,
+            group=cls.test_group,
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'group_name': self.test_group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.test_post.id}),
+        )
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_posts_unchanged_pages_return_not_modified(self):
+        """Check if a repeated request with the same ETag gets 304"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.revalidate(self.authorized_client, url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_posts_not_modified_skips_page_queries(self):
+        """Check if a 304 answer does not query the posts table"""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_posts_new_post_changes_etag(self):
+        """Check if the pages are rendered again after a new post"""
+        etags = {url: self.authorized_client.get(url)['ETag']
+                 for url in self.urls[:3]}
+        Post.objects.create(
+            text='Новый пост', author=self.user, group=self.test_group
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_posts_new_comment_changes_post_detail_etag(self):
+        """Check if a comment invalidates the post page"""
+        url = self.urls[3]
+        etag = self.authorized_client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.test_post, author=self.user, text='Комментарий'
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_posts_etag_depends_on_user(self):
+        """Check if another user does not get the cached page of the first"""
+        url = reverse('posts:index')
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_posts_anonymous_if_modified_since(self):
+        """Check if an anonymous client gets 304 by Last-Modified"""
+        url = reverse('posts:index')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.test_post.save()
+        response = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=http_date(
+                self.test_post.updated_at.timestamp() - 1
+            )
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_posts_follow_changes_profile_of_the_follower(self):
+        """Check if a follow or unfollow re-renders the follower profile"""
+        author = User.objects.create_user(username='Author')
+        url = reverse('posts:profile',
+                      kwargs={'username': self.user.username})
+        for change in (
+            lambda: Follow.objects.create(user=self.user, author=author),
+            lambda: Follow.objects.filter(user=self.user).delete(),
+        ):
+            etag = self.client.get(url)['ETag']
+            change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_posts_write_in_another_process_changes_etag(self):
+        """Check if a post saved by another process changes the ETags"""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        with other_process():
+            self.test_post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_posts_versions_cache_must_be_shared(self):
+        """Check if a process-local versions cache fails the checks"""
+        self.assertEqual(check_versions_cache(None), [])
+        local = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        }
+        for backend in (local['default'], {
+            'BACKEND': 'core.backends.MetricsCache',
+            'OPTIONS': local['default'],
+        }):
+            with self.subTest(backend=backend['BACKEND']), \
+                    override_settings(CACHES={**local, 'versions': backend}):
+                errors = check_versions_cache(None)
+                self.assertEqual([error.id for error in errors],
+                                 ['posts.E002'])
+        with override_settings(CACHES=local):
+            errors = check_versions_cache(None)
+        self.assertEqual([error.id for error in errors], ['posts.E001'])
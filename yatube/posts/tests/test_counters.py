@@ -0,0 +1,126 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.counters import counters_for
+from posts.models import Comment, Follow, Post, UserCounters
+from users.forms import User
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.subscriber = User.objects.create_user(username='Subscriber')
+        cls.post = Post.objects.create(text='Запись', author=cls.author)
+
+    def setUp(self) -> None:
+        self.subscriber_client = Client()
+        self.subscriber_client.force_login(self.subscriber)
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_posts_post_counter_follows_writes(self):
+        """Check if the author post counter changes with posts"""
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        new_post = Post.objects.create(text='Ещё запись', author=self.author)
+        self.assertEqual(self.counters(self.author).posts_count, 2)
+        new_post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+
+    def test_posts_follow_counters_follow_writes(self):
+        """Check if follower and following counters change with follows"""
+        self.subscriber_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.subscriber).following_count, 1)
+        self.subscriber_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.subscriber).following_count, 0)
+
+    def test_posts_comment_counter_follows_writes(self):
+        """Check if the post comment counter changes with comments"""
+        self.subscriber_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Comment.objects.get(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_posts_post_save_keeps_concurrent_comments(self):
+        """Check if saving a loaded post does not undo a newer comment"""
+        post = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            post=self.post, author=self.subscriber, text='Комментарий'
+        )
+        post.text = 'Изменённая запись'
+        post.save()
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Ещё раз изменённая запись'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Ещё раз изменённая запись')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_posts_counters_row_created_twice(self):
+        """Check if a counters row created by a parallel view is kept"""
+        UserCounters.objects.filter(user=self.subscriber).delete()
+        reader = User.objects.get(pk=self.subscriber.pk)
+
+        def row_created_in_parallel(user_ids):
+            UserCounters.objects.create(user=reader, following_count=5)
+            return set()
+
+        with mock.patch('posts.counters.set', create=True,
+                        side_effect=row_created_in_parallel):
+            counters = counters_for(reader)
+        self.assertEqual(counters.following_count, 5)
+
+    def test_posts_reconcile_command_fixes_drift(self):
+        """Check if reconcile_counters restores broken counters"""
+        Follow.objects.create(user=self.subscriber, author=self.author)
+        Comment.objects.create(
+            post=self.post, author=self.subscriber, text='Комментарий'
+        )
+        UserCounters.objects.update(
+            posts_count=10, followers_count=10, following_count=10
+        )
+        Post.objects.update(comments_count=10)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        author = self.counters(self.author)
+        self.assertEqual(
+            (author.posts_count, author.followers_count,
+             author.following_count),
+            (1, 1, 0)
+        )
+        self.assertEqual(self.counters(self.subscriber).following_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_posts_post_detail_reads_stored_counter(self):
+        """Check if the post page shows counters without COUNT queries"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.subscriber_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+            )
+        self.assertEqual(response.context['author_counters'].posts_count, 1)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
@@ -0,0 +1,70 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.counts import estimate_count, get_count
+from posts.models import Post
+from users.forms import User
+
+
+class CountProviderTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        for i in range(3):
+            Post.objects.create(text=f'Пост №{i}', author=cls.user)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_posts_count_is_cached(self):
+        """Check if a repeated count is served from the cache"""
+        posts = self.user.posts.all()
+        self.assertEqual(get_count(posts), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_count(self.user.posts.all()), 3)
+
+    def test_posts_count_is_invalidated_on_create_and_delete(self):
+        """Check if creating and deleting a post resets the cached count"""
+        get_count(self.user.posts.all())
+        new_post = Post.objects.create(text='Новый пост', author=self.user)
+        self.assertEqual(get_count(self.user.posts.all()), 4)
+        new_post.delete()
+        self.assertEqual(get_count(self.user.posts.all()), 3)
+
+    def test_posts_count_notices_bulk_created_posts(self):
+        """Check if posts inserted without signals still change the count"""
+        get_count(self.user.posts.all())
+        Post.objects.bulk_create([Post(text='Пачка', author=self.user)])
+        self.assertEqual(get_count(self.user.posts.all()), 4)
+
+    def test_posts_profile_uses_count_provider(self):
+        """Check if the profile count comes from the cache on a repeat visit"""
+        url = reverse('posts:profile', kwargs={'username': self.user.username})
+        self.authorized_client.get(url)
+        with mock.patch('django.db.models.query.QuerySet.count') as count:
+            response = self.authorized_client.get(url)
+        count.assert_not_called()
+        self.assertEqual(response.context['posts_count'], 3)
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=2)
+    def test_posts_update_statistics_enables_estimates(self):
+        """Check if update_statistics collects the stats for estimates"""
+        call_command('update_statistics', stdout=StringIO())
+        self.assertEqual(estimate_count(Post.objects.all()), 3)
+
+    @override_settings(COUNT_ESTIMATE_THRESHOLD=2)
+    def test_posts_count_is_estimated_from_sqlite_stat1(self):
+        """Check if a big unfiltered table count comes from ANALYZE stats"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimate_count(Post.objects.all()), 3)
+        self.assertIsNone(estimate_count(self.user.posts.all()))
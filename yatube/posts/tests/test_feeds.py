@@ -0,0 +1,166 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.feeds import PostsFeed
+from posts.models import Group, Post
+from users.forms import User
+
+POSTS_COUNT = 3
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        for i in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                text=f'Пост №{i}', author=cls.author, group=cls.group
+            )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        group = {'group_name': self.group.slug}
+        author = {'username': self.author.username}
+        self.urls = {
+            'application/rss+xml': (
+                reverse('posts:index_rss'),
+                reverse('posts:group_rss', kwargs=group),
+                reverse('posts:profile_rss', kwargs=author),
+            ),
+            'application/atom+xml': (
+                reverse('posts:index_atom'),
+                reverse('posts:group_atom', kwargs=group),
+                reverse('posts:profile_atom', kwargs=author),
+            ),
+        }
+
+    def test_feeds_list_latest_posts(self):
+        """Check if every feed lists the posts with links to them"""
+        link = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        for content_type, urls in self.urls.items():
+            for url in urls:
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertTrue(
+                        response['Content-Type'].startswith(content_type)
+                    )
+                    self.assertContains(response, self.post.text)
+                    self.assertContains(response, link)
+
+    def test_feeds_are_limited(self):
+        """Check if a feed holds no more than SYNDICATION_ITEMS posts"""
+        with self.settings(SYNDICATION_ITEMS=1):
+            response = self.client.get(reverse('posts:index_rss'))
+        self.assertContains(response, '<item>', count=1)
+
+    def test_feeds_unchanged_return_not_modified(self):
+        """Check if a feed answers 304 by ETag and by Last-Modified"""
+        url = reverse('posts:group_atom',
+                      kwargs={'group_name': self.group.slug})
+        response = self.client.get(url)
+        for header, value in (
+            ('HTTP_IF_NONE_MATCH', response['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified']),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(
+                    self.client.get(url, **{header: value}).status_code,
+                    HTTPStatus.NOT_MODIFIED,
+                )
+
+    def test_feeds_are_rendered_once(self):
+        """Check if a repeated feed request is served from the cache"""
+        url = reverse('posts:profile_rss',
+                      kwargs={'username': self.author.username})
+        first = self.client.get(url)
+        with mock.patch.object(PostsFeed, 'items',
+                               side_effect=AssertionError):
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    @override_settings(ALLOWED_HOSTS=['localhost', '127.0.0.1'])
+    def test_feeds_keep_links_of_each_host_and_scheme(self):
+        """Check if a cached feed is not reused for another host or scheme"""
+        url = reverse('posts:index_rss')
+        first = self.client.get(url, HTTP_HOST='127.0.0.1')
+        for host, secure, link in (
+            ('localhost', False, 'http://localhost/'),
+            ('127.0.0.1', True, 'https://127.0.0.1/'),
+        ):
+            with self.subTest(host=host, secure=secure):
+                response = self.client.get(
+                    url, HTTP_HOST=host, secure=secure,
+                    HTTP_IF_NONE_MATCH=first['ETag'],
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, f'<link>{link}</link>')
+
+    def test_feeds_new_post_refreshes_feed(self):
+        """Check if a saved post shows up in the cached feeds"""
+        responses = {
+            url: self.client.get(url)
+            for urls in self.urls.values() for url in urls
+        }
+        post = Post.objects.create(
+            text='Свежий пост', author=self.author, group=self.group
+        )
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                fresh = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(fresh.status_code, HTTPStatus.OK)
+                self.assertContains(fresh, post.text)
+
+    def test_feeds_post_saved_in_another_process_refreshes_feed(self):
+        """Check if a cached feed shows a post saved by another process"""
+        url = reverse('posts:index_rss')
+        self.client.get(url)
+        # У другого процесса свой кеш 'default', общий только кеш версий.
+        with mock.patch.dict(caches._caches.caches,
+                             {'default': LocMemCache('other', {})}):
+            post = Post.objects.create(text='Свежий пост', author=self.author)
+        self.assertContains(self.client.get(url), post.text)
+
+    def test_feeds_missing_object_is_not_found(self):
+        """Check if feeds of a missing group or author answer 404"""
+        for name, kwargs in (
+            ('posts:group_rss', {'group_name': 'missing'}),
+            ('posts:group_atom', {'group_name': 'missing'}),
+            ('posts:profile_rss', {'username': 'missing'}),
+            ('posts:profile_atom', {'username': 'missing'}),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_feeds_linked_from_pages(self):
+        """Check if pages advertise their feeds in the head"""
+        pages = (
+            (reverse('posts:index'), reverse('posts:index_rss')),
+            (reverse('posts:group_list',
+                     kwargs={'group_name': self.group.slug}),
+             reverse('posts:group_atom',
+                     kwargs={'group_name': self.group.slug})),
+            (reverse('posts:profile',
+                     kwargs={'username': self.author.username}),
+             reverse('posts:profile_rss',
+                     kwargs={'username': self.author.username})),
+        )
+        for page, feed in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), f'href="{feed}"')
@@ -0,0 +1,218 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.follows import (followed_author_ids, following_key, is_following,
+                           pack_ids, unpack_ids)
+from posts.models import Follow, Post, TimelineEntry, UserCounters
+from users.forms import User
+
+
+class FollowGraphCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.another_author = User.objects.create_user(username='Another')
+        Follow.objects.create(user=cls.reader, author=cls.another_author)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_followed_ids_are_packed_sorted(self):
+        """Check if the followed set is stored as sorted packed ids"""
+        self.assertEqual(list(unpack_ids(pack_ids([30, 2, 7]))), [2, 7, 30])
+        followed_author_ids(self.reader.id)
+        self.assertIsInstance(cache.get(following_key(self.reader.id)), bytes)
+
+    def test_followed_ids_are_served_from_cache(self):
+        """Check if a repeated lookup does not touch the database"""
+        followed_author_ids(self.reader.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(self.reader, self.another_author))
+            self.assertFalse(is_following(self.reader, self.author))
+            self.assertFalse(is_following(self.reader, self.reader))
+
+    def test_follow_and_unfollow_reset_the_cache(self):
+        """Check if following and unfollowing change the cached state"""
+        kwargs = {'username': self.author.username}
+        self.assertFalse(is_following(self.reader, self.author))
+        self.reader_client.get(reverse('posts:profile_follow', kwargs=kwargs))
+        self.assertTrue(is_following(self.reader, self.author))
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs=kwargs)
+        )
+        self.assertFalse(is_following(self.reader, self.author))
+
+    def test_profile_reads_follow_state_from_cache(self):
+        """Check if the profile page does not query follows on a repeat"""
+        url = reverse('posts:profile',
+                      kwargs={'username': self.another_author.username})
+        self.reader_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url)
+        self.assertTrue(response.context['following'])
+        follow_table = Follow._meta.db_table
+        self.assertFalse(
+            [query for query in queries if follow_table in query['sql']]
+        )
+
+    def test_follow_index_without_follows_skips_timeline(self):
+        """Check if a user following nobody gets an empty feed for free"""
+        lonely_client = Client()
+        lonely_client.force_login(self.author)
+        lonely_client.get(reverse('posts:follow_index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = lonely_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertFalse(
+            [query for query in queries if 'timeline' in query['sql']]
+        )
+
+
+class FollowBulkTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}') for i in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def post_json(self, data):
+        return self.reader_client.post(
+            reverse('posts:follow_bulk'),
+            json.dumps(data),
+            content_type='application/json',
+        )
+
+    def test_repeated_follow_does_not_write(self):
+        """Check if following twice keeps one row and one counted follower"""
+        url = reverse('posts:profile_follow',
+                      kwargs={'username': self.authors[1].username})
+        self.reader_client.get(url)
+        self.reader_client.get(url)
+        self.assertEqual(
+            Follow.objects.filter(author=self.authors[1]).count(), 1
+        )
+        self.assertEqual(
+            UserCounters.objects.get(user=self.authors[1]).followers_count, 1
+        )
+
+    def test_follow_writes_despite_a_stale_cache(self):
+        """Check if a cached follow set does not stop the follow write"""
+        author = self.authors[1]
+        cache.set(following_key(self.reader.id), pack_ids([author.id]))
+        self.reader_client.get(reverse('posts:profile_follow',
+                                       kwargs={'username': author.username}))
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=author).exists()
+        )
+
+    def test_bulk_follows_and_unfollows(self):
+        """Check if the bulk endpoint applies both lists and reports them"""
+        response = self.post_json({
+            'follow': ['Author1', 'Author2', 'Author0', 'Reader', 'Nobody'],
+            'unfollow': ['Author0'],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'followed': ['Author1', 'Author2'],
+            'unfollowed': ['Author0'],
+            'unchanged': ['Author0', 'Reader'],
+            'missing': ['Nobody'],
+        })
+        self.assertEqual(
+            set(self.reader.follower.values_list(
+                'author__username', flat=True
+            )),
+            {'Author1', 'Author2'},
+        )
+
+    def test_bulk_follows_by_rows_not_cache(self):
+        """Check if the bulk result comes from Follow rows, not the cache"""
+        cache.set(following_key(self.reader.id),
+                  pack_ids([self.authors[1].id]))
+        response = self.post_json({'follow': ['Author1'],
+                                   'unfollow': ['Author0']})
+        self.assertEqual(response.json()['followed'], ['Author1'])
+        self.assertEqual(response.json()['unfollowed'], ['Author0'])
+        self.assertEqual(
+            list(self.reader.follower.values_list(
+                'author__username', flat=True
+            )),
+            ['Author1'],
+        )
+
+    def test_bulk_needs_login(self):
+        """Check if an anonymous JSON client gets 401, not a login page"""
+        response = self.client.post(
+            reverse('posts:follow_bulk'),
+            json.dumps({'follow': ['Author1']}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_bulk_rejects_bad_payload(self):
+        """Check if malformed bodies are answered with 400"""
+        for body in ('[]', '{"follow": "Author1"}', '{"unfollow": [1]}',
+                     'not json'):
+            with self.subTest(body=body):
+                response = self.reader_client.post(
+                    reverse('posts:follow_bulk'),
+                    body,
+                    content_type='application/json',
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    @override_settings(FOLLOW_BULK_LIMIT=2)
+    def test_bulk_limits_the_list(self):
+        """Check if too many authors in one request are rejected whole"""
+        response = self.post_json({'follow': ['Author1', 'Author2'],
+                                   'unfollow': ['Author0']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.reader.follower.count(), 1)
+
+
+class DedupeFollowsTest(TransactionTestCase):
+    def test_dedupe_removes_duplicates_and_adds_index(self):
+        """Check if a legacy table loses duplicates and gains the index"""
+        constraint, = Follow._meta.constraints
+        # SQLite пересобирает таблицу по Meta.constraints.
+        with mock.patch.object(Follow._meta, 'constraints', []):
+            with connection.schema_editor() as editor:
+                editor.remove_constraint(Follow, constraint)
+        reader = User.objects.create_user(username='Reader')
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Запись', author=author)
+        for _ in range(3):
+            Follow.objects.create(user=reader, author=author)
+        out = StringIO()
+        call_command('dedupe_follows', stdout=out)
+        self.assertIn('Удалено повторных подписок: 2', out.getvalue())
+        self.assertIn('добавлен', out.getvalue())
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=author).followers_count, 1
+        )
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 1)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=reader, author=author)
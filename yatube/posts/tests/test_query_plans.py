@@ -0,0 +1,234 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.benchmark import send
+from posts.models import Comment, Follow, Group, Post
+from posts.urls import urlpatterns
+from posts.utils import encode_cursor
+from users.forms import User
+
+# Таблицы, которые растут вместе с сайтом: по ним полный просмотр
+# или сортировка во временном B-дереве недопустимы.
+HOT_TABLES = (
+    'posts_post',
+    'posts_comment',
+    'posts_follow',
+    'posts_timelineentry',
+    'posts_usercounters',
+    'auth_user',
+)
+# Ранжированная выдача сортируется по релевантности, и сортируется
+# только найденное FTS5, а не вся таблица.
+RANKED_VIEWS = ('search',)
+
+
+def plan_problems(sql, params, allow_sort=False):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        details = [row[-1] for row in cursor.fetchall()]
+    problems = []
+    for detail in details:
+        if 'USE TEMP B-TREE' in detail and not allow_sort:
+            problems.append(detail)
+        words = detail.split()
+        if (words[0] == 'SCAN'
+                and words[1].strip('"') in HOT_TABLES
+                and 'USING' not in detail):
+            problems.append(detail)
+    return problems
+
+
+class QueryPlanTest(TestCase):
+    """Каждый запрос каждой страницы posts должен идти по индексу."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            post = Post.objects.create(
+                text=f'Пост №{i}',
+                author=cls.author,
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=post,
+                author=cls.reader,
+                text=f'Комментарий №{i}',
+            )
+        cls.post = post
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def requests(self):
+        """Запросы, которыми проверяется каждый маршрут posts."""
+        author = {'username': self.author.username}
+        post = {'post_id': self.post.id}
+        return {
+            'index': ('get', reverse('posts:index'), {}),
+            'group_list': (
+                'get',
+                reverse('posts:group_list',
+                        kwargs={'group_name': self.group.slug}),
+                {},
+            ),
+            'profile': ('get', reverse('posts:profile', kwargs=author), {}),
+            'post_detail': (
+                'get', reverse('posts:post_detail', kwargs=post), {}
+            ),
+            'post_create': (
+                'post',
+                reverse('posts:post_create'),
+                {'text': 'Новый пост', 'group': self.group.id},
+            ),
+            'post_edit': (
+                'post',
+                reverse('posts:post_edit', kwargs=post),
+                {'text': 'Изменённый пост', 'group': self.group.id},
+            ),
+            'post_comments': (
+                'get', reverse('posts:post_comments', kwargs=post), {}
+            ),
+            'add_comment': (
+                'post',
+                reverse('posts:add_comment', kwargs=post),
+                {'text': 'Новый комментарий'},
+            ),
+            'add_comment_fragment': (
+                'post',
+                reverse('posts:add_comment_fragment', kwargs=post),
+                {'text': 'Новый комментарий'},
+            ),
+            'follow_index': ('get', reverse('posts:follow_index'), {}),
+            'index_cards': ('get', reverse('posts:index_cards'), {}),
+            'group_cards': (
+                'get',
+                reverse('posts:group_cards',
+                        kwargs={'group_name': self.group.slug}),
+                {},
+            ),
+            'profile_cards': (
+                'get', reverse('posts:profile_cards', kwargs=author), {}
+            ),
+            'follow_cards': ('get', reverse('posts:follow_cards'), {}),
+            'follow_bulk': (
+                'post',
+                reverse('posts:follow_bulk'),
+                json.dumps({'follow': [self.reader.username],
+                            'unfollow': [self.author.username]}),
+            ),
+            'profile_follow': (
+                'get', reverse('posts:profile_follow', kwargs=author), {}
+            ),
+            'profile_unfollow': (
+                'get', reverse('posts:profile_unfollow', kwargs=author), {}
+            ),
+            'search': ('get', reverse('posts:search'), {'q': 'Пост'}),
+            'index_rss': ('get', reverse('posts:index_rss'), {}),
+            'index_atom': ('get', reverse('posts:index_atom'), {}),
+            'group_rss': (
+                'get',
+                reverse('posts:group_rss',
+                        kwargs={'group_name': self.group.slug}),
+                {},
+            ),
+            'group_atom': (
+                'get',
+                reverse('posts:group_atom',
+                        kwargs={'group_name': self.group.slug}),
+                {},
+            ),
+            'profile_rss': (
+                'get', reverse('posts:profile_rss', kwargs=author), {}
+            ),
+            'profile_atom': (
+                'get', reverse('posts:profile_atom', kwargs=author), {}
+            ),
+            'api_index': ('get', reverse('posts:api_index'), {}),
+            'api_group_list': (
+                'get',
+                reverse('posts:api_group_list',
+                        kwargs={'group_name': self.group.slug}),
+                {},
+            ),
+            'api_profile': (
+                'get', reverse('posts:api_profile', kwargs=author), {}
+            ),
+            'api_follow_index': (
+                'get', reverse('posts:api_follow_index'), {}
+            ),
+            'api_posts': (
+                'get',
+                reverse('posts:api_posts'),
+                {'ids': f'{self.post.id},{self.post.id - 1}'},
+            ),
+            'api_post_detail': (
+                'get', reverse('posts:api_post_detail', kwargs=post), {}
+            ),
+        }
+
+    def test_posts_every_route_has_a_plan_check(self):
+        """Check if every posts URL is covered by the query plan suite"""
+        self.assertEqual(
+            {pattern.name for pattern in urlpatterns},
+            set(self.requests())
+        )
+
+    def assert_indexed_queries(self, client, method, url, data,
+                               allow_sort=False):
+        with CaptureQueriesContext(connection) as queries:
+            send(client, method, url, data)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'sqlite_stat1' in sql:
+                continue
+            self.assertEqual(plan_problems(sql, (), allow_sort), [], sql)
+
+    def test_posts_queries_use_indexes(self):
+        """Check if no view query scans a big table or sorts in a temp tree"""
+        for name, (method, url, data) in self.requests().items():
+            client = (self.author_client if name in ('post_edit',)
+                      else self.reader_client)
+            with self.subTest(view=name):
+                self.assert_indexed_queries(
+                    client, method, url, data, name in RANKED_VIEWS
+                )
+
+    def test_posts_cursor_pages_use_indexes(self):
+        """Check if deep cursor pages are read by index too"""
+        token = encode_cursor((self.post.pub_date, self.post.id))
+        for name in ('index', 'group_list', 'profile', 'follow_index',
+                     'api_index', 'api_group_list', 'api_profile',
+                     'api_follow_index'):
+            _, url, _ = self.requests()[name]
+            for param in ('after', 'before'):
+                with self.subTest(view=name, param=param):
+                    self.assert_indexed_queries(
+                        self.reader_client, 'get', f'{url}?{param}={token}', {}
+                    )
+
+    def test_posts_comment_pages_use_indexes(self):
+        """Check if deep comment pages are read by index too"""
+        comment = self.post.comments.get()
+        token = encode_cursor((comment.created, comment.id))
+        _, url, _ = self.requests()['post_comments']
+        self.assert_indexed_queries(
+            self.reader_client, 'get', f'{url}?after={token}', {}
+        )
@@ -0,0 +1,160 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.utils import encode_token
+from users.forms import User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.post = Post.objects.create(
+            text='Сегодня пекли <b>черничный</b> пирог',
+            author=cls.user,
+        )
+        cls.another_post = Post.objects.create(
+            text='Про погоду',
+            author=cls.user,
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.another_post,
+            author=cls.user,
+            text='А у нас черничный дождь',
+        )
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+
+    def test_posts_search_finds_posts_and_comments(self):
+        """Check if the search returns matches from posts and comments"""
+        response = self.search('черничный')
+        results = list(response.context['page_obj'])
+        self.assertEqual(
+            {(result.kind, result.post) for result in results},
+            {('post', self.post), ('comment', self.another_post)}
+        )
+
+    def test_posts_search_highlights_and_escapes_snippet(self):
+        """Check if the snippet marks the match and escapes the post HTML"""
+        response = self.search('пирог')
+        self.assertContains(response, '<mark>пирог</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_posts_search_index_follows_edits_and_deletes(self):
+        """Check if the index is updated when texts change"""
+        self.post.text = 'Совсем другой текст'
+        self.post.save()
+        self.assertEqual(len(self.search('пирог').context['page_obj']), 0)
+        self.comment.delete()
+        self.assertEqual(
+            len(self.search('черничный').context['page_obj']), 0
+        )
+
+    def test_posts_search_is_paginated_by_cursor(self):
+        """Check if the next page continues after the cursor"""
+        for i in range(12):
+            Post.objects.create(text=f'Ромашка {i}', author=self.user)
+        first = self.search('ромашка').context['page_obj']
+        second = self.search(
+            'ромашка', after=first.next_cursor
+        ).context['page_obj']
+        self.assertEqual(len(first) + len(second), 12)
+        self.assertFalse(
+            {r.post_id for r in first} & {r.post_id for r in second}
+        )
+
+    def test_posts_search_with_damaged_cursor_returns_first_page(self):
+        """Check if a damaged search cursor falls back to the first page"""
+        first = list(self.search('черничный').context['page_obj'])
+        for values in (
+            [0, 'post', 2 ** 70],
+            [0, 'post', {}],
+            [[1], 'post', 1],
+            [2 ** 70, 'post', 1],
+            [0, 'user', 1],
+            [0, 'post', True],
+            [0, 'post'],
+            {'rank': 0},
+        ):
+            with self.subTest(values=values):
+                response = self.search('черничный',
+                                       after=encode_token(values))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']), first)
+        # [NaN, "post", 1]: json принимает NaN, а SQLite — нет
+        response = self.search('черничный', after='W05hTiwicG9zdCIsMV0')
+        self.assertEqual(list(response.context['page_obj']), first)
+
+    def test_posts_search_ignores_fts_syntax(self):
+        """Check if FTS5 operators in the query do not break the search"""
+        response = self.search('черничный OR "NEAR(')
+        self.assertEqual(response.status_code, 200)
+
+    def test_posts_admin_search_uses_index(self):
+        """Check if the admin search goes through the FTS5 index"""
+        model_admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, _ = model_admin.get_search_results(
+            request, Post.objects.all(), 'пирог'
+        )
+        self.assertIn('posts_post_fts', str(queryset.query))
+        self.assertEqual(list(queryset), [self.post])
+
+    def test_posts_admin_blank_search_lists_everything(self):
+        """Check if a whitespace-only admin search shows all posts"""
+        self.client.force_login(
+            User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        )
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': ' '}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count,
+                         Post.objects.count())
+
+
+class SearchUnavailableTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.post = Post.objects.create(text='Черничный пирог', author=cls.user)
+
+    def test_posts_search_without_index_is_empty(self):
+        """Check if search without an FTS5 index answers an empty page"""
+        missing = {Post: 'missing_post_fts', Comment: 'missing_comment_fts'}
+        for patch in (
+            mock.patch('posts.search.search_available', return_value=False),
+            mock.patch.dict('posts.search.SEARCH_TABLES', missing),
+        ):
+            with self.subTest(patch=patch), patch:
+                response = self.client.get(reverse('posts:search'),
+                                           {'q': 'пирог'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page_obj']), 0)
+                self.assertContains(response, 'Поиск сейчас недоступен')
+
+    def test_posts_admin_search_without_index_uses_like(self):
+        """Check if the admin search falls back without an FTS5 index"""
+        model_admin = site._registry[Post]
+        with mock.patch('posts.search.search_available', return_value=False):
+            queryset, _ = model_admin.get_search_results(
+                RequestFactory().get('/'), Post.objects.all(), 'пирог'
+            )
+        self.assertNotIn('_fts', str(queryset.query))
+        self.assertEqual(list(queryset), [self.post])
+
+
+class SearchPageTest(TestCase):
+    def test_posts_search_page_is_available(self):
+        """Check if the empty search page opens for a guest"""
+        response = Client().get(reverse('posts:search'))
+        self.assertTemplateUsed(response, 'posts/search.html')
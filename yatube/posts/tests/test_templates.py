@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, RequestFactory, TestCase
 from django.urls import reverse
 
+from posts.caches import SITE_SCOPE, feed_cache_context, feed_version
 from posts.models import Group, Post
 from users.forms import User
 
@@ -50,3 +52,113 @@ class CachedPagesTest(TestCase):
         self.assertEqual(first_object.text, self.test_post.text)
         self.assertEqual(first_object.group, self.test_post.group)
         self.assertEqual(first_object.author, self.test_post.author)
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.test_group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        cls.another_group = Group.objects.create(
+            title='Заголовок второй группы',
+            description='Описание второй группы',
+            slug='another-slug',
+        )
+        for i in range(settings.NUMBER_OF_LAST_RECORDS + 1):
+            Post.objects.create(
+                text=f'Пост №{i}',
+                author=cls.user,
+                group=cls.test_group,
+            )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_posts_cached_index_pages_do_not_mix(self):
+        """Check if the second index page is not served from page 1 cache"""
+        self.authorized_client.get(reverse('posts:index'))
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?page=2'
+        )
+        self.assertContains(response, 'Пост №0')
+        self.assertNotContains(response, 'Пост №1</p>')
+
+    def test_posts_new_post_invalidates_cached_feeds(self):
+        """Check if a new post shows up on cached feeds at once"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'group_name': self.test_group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Свежий пост', 'group': self.test_group.id},
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.authorized_client.get(url), 'Свежий пост'
+                )
+
+    def test_posts_edit_invalidates_previous_group_feed(self):
+        """Check if moving a post to another group refreshes both groups"""
+        post = Post.objects.first()
+        url = reverse('posts:group_list',
+                      kwargs={'group_name': self.test_group.slug})
+        self.authorized_client.get(url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Перенесённый пост', 'group': self.another_group.id},
+        )
+        self.assertNotContains(
+            self.authorized_client.get(url), 'Перенесённый пост'
+        )
+        self.assertContains(
+            self.authorized_client.get(
+                reverse('posts:group_list',
+                        kwargs={'group_name': self.another_group.slug})
+            ),
+            'Перенесённый пост'
+        )
+
+    def test_posts_delete_invalidates_cached_index(self):
+        """Check if a deleted post disappears from the cached index"""
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(text='Пост №10').delete()
+        self.assertNotContains(
+            self.authorized_client.get(reverse('posts:index')), 'Пост №10'
+        )
+
+    def test_posts_only_card_fields_of_a_user_reset_feeds(self):
+        """Check if a password change keeps feeds and a rename drops them"""
+        user = User.objects.get(pk=self.user.pk)
+        version = feed_version(SITE_SCOPE)
+        user.set_password('new-password')
+        user.save()
+        user.email = 'name@example.com'
+        user.save()
+        self.assertEqual(feed_version(SITE_SCOPE), version)
+        user.first_name = 'Имя'
+        user.save()
+        self.assertNotEqual(feed_version(SITE_SCOPE), version)
+
+    def test_posts_feed_cache_key_ignores_unknown_params(self):
+        """Check if only page, after and before make a new cache key"""
+        def key(query):
+            request = RequestFactory().get('/' + query)
+            return feed_cache_context(request, SITE_SCOPE)['feed_cache_key']
+        self.assertEqual(key('?utm_source=mail&x=1'), key(''))
+        self.assertEqual(key('?page=2&utm_source=mail'), key('?page=2'))
+        self.assertNotEqual(key('?page=2'), key(''))
+        self.assertNotEqual(key('?after=abc'), key('?before=abc'))
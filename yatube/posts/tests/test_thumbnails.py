@@ -0,0 +1,163 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.thumbnails import (generate_thumbnails, ready_thumbnail,
+                              ready_thumbnails)
+from users.forms import User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='Запись с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_missing_thumbnail_is_not_generated_on_render(self):
+        """Check a page shows the original image until thumbnails exist."""
+        post = self.create_post()
+        self.assertIsNone(ready_thumbnail(post.image, 'card'))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertIsNone(ready_thumbnail(post.image, 'card'))
+
+    def test_generated_thumbnail_is_used(self):
+        """Check pages link the thumbnail once it has been generated."""
+        post = self.create_post()
+        generate_thumbnails(post.image.name)
+        thumbnail = ready_thumbnail(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=(post.pk,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, thumbnail.url)
+                self.assertNotContains(response, f'src="{post.image.url}"')
+
+    def test_upload_schedules_thumbnails(self):
+        """Check saving a post with a new image generates its thumbnails."""
+        with mock.patch('posts.forms.transaction.on_commit') as on_commit:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={
+                    'text': 'Новая запись',
+                    'image': SimpleUploadedFile(
+                        'upload.gif', SMALL_GIF, 'image/gif'
+                    ),
+                },
+            )
+        for call in on_commit.call_args_list:
+            call.args[0]()
+        post = Post.objects.get(text='Новая запись')
+        self.assertIsNotNone(ready_thumbnail(post.image, 'card'))
+
+    def test_edit_without_new_image_schedules_nothing(self):
+        """Check editing only the text does not touch thumbnails."""
+        post = self.create_post()
+        with mock.patch('posts.forms.transaction.on_commit') as on_commit:
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                data={'text': 'Другой текст'},
+            )
+        on_commit.assert_not_called()
+
+    def test_ready_thumbnails_match_single_lookups(self):
+        """Check the bulk lookup returns what single lookups return."""
+        posts = [self.create_post(f'image{index}.gif') for index in range(3)]
+        generate_thumbnails(posts[0].image.name)
+        generate_thumbnails(posts[1].image.name)
+        cache.clear()
+        images = [post.image for post in posts]
+        thumbnails = ready_thumbnails(images, 'card')
+        for image in images:
+            with self.subTest(image=image.name):
+                single = ready_thumbnail(image, 'card')
+                self.assertEqual(
+                    getattr(thumbnails[image], 'url', None),
+                    getattr(single, 'url', None),
+                )
+        self.assertIsNone(thumbnails[images[2]])
+
+    def test_feed_reads_thumbnails_in_one_query(self):
+        """Check a feed page looks up all card thumbnails at once."""
+        for index in range(5):
+            post = self.create_post(f'feed{index}.gif')
+            generate_thumbnails(post.image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        kvstore_queries = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        self.assertEqual(response.content.count(b'<picture>'), 5)
+
+    @override_settings(
+        POST_THUMBNAIL_WIDTHS=(480, 1920),
+        POST_THUMBNAIL_FORMATS=('UNKNOWN', 'WEBP'),
+    )
+    def test_picture_lists_every_width_and_format(self):
+        """Check the picture offers WebP widths and a full-size JPEG."""
+        post = self.create_post()
+        generate_thumbnails(post.image.name)
+        picture = ready_thumbnail(post.image, 'card')
+        self.assertEqual(
+            [source['type'] for source in picture.sources],
+            ['image/webp', 'image/jpeg'],
+        )
+        for source in picture.sources:
+            with self.subTest(type=source['type']):
+                self.assertEqual(
+                    [item.split()[1] for item in source['srcset'].split(', ')],
+                    ['480w', '960w'],
+                )
+        self.assertTrue(picture.url.endswith('.jpg'))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'src="{picture.url}"')
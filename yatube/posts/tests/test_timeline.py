@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+from users.forms import User
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.another_author = User.objects.create_user(username='Another')
+        cls.subscriber = User.objects.create_user(username='Subscriber')
+        cls.old_post = Post.objects.create(
+            text='Старая запись',
+            author=cls.author,
+        )
+
+    def setUp(self) -> None:
+        self.subscriber_client = Client()
+        self.subscriber_client.force_login(self.subscriber)
+
+    def test_posts_follow_backfills_timeline(self):
+        """Check if the author's existing posts get into a new follower feed"""
+        self.subscriber_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.subscriber,
+                post=self.old_post,
+            ).exists()
+        )
+
+    def test_posts_new_post_is_fanned_out_to_followers(self):
+        """Check if a created post is written into the followers' feeds"""
+        Follow.objects.create(user=self.subscriber, author=self.author)
+        new_post = Post.objects.create(text='Новая запись', author=self.author)
+        Post.objects.create(text='Чужая запись', author=self.another_author)
+        response = self.subscriber_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [new_post, self.old_post]
+        )
+
+    def test_posts_unfollow_clears_timeline(self):
+        """Check if unfollowing removes the author's posts from the feed"""
+        Follow.objects.create(user=self.subscriber, author=self.author)
+        self.subscriber_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.subscriber).exists()
+        )
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_posts_timeline_is_trimmed(self):
+        """Check if the feed keeps only TIMELINE_MAX_LENGTH latest posts"""
+        Follow.objects.create(user=self.subscriber, author=self.author)
+        for i in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                Post.objects.create(text=f'Запись {i}', author=self.author)
+            self.assertFalse(any(
+                'ROW_NUMBER' in query['sql'] for query in queries
+            ))
+        call_command('rebuild_timelines', '--trim-only', stdout=StringIO())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.subscriber).count(), 2
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=self.old_post).exists()
+        )
+
+    def test_posts_follow_index_reads_timeline_in_one_query(self):
+        """Check if the feed page is read with a single posts query"""
+        Follow.objects.create(user=self.subscriber, author=self.author)
+        Follow.objects.create(user=self.subscriber, author=self.another_author)
+        for i in range(5):
+            Post.objects.create(text=f'Запись {i}', author=self.another_author)
+        self.subscriber_client.get(reverse('posts:follow_index'))
+        with CaptureQueriesContext(connection) as queries:
+            self.subscriber_client.get(reverse('posts:follow_index'))
+        posts_queries = [
+            query['sql'] for query in queries
+            if 'posts_post' in query['sql']
+        ]
+        self.assertEqual(len(posts_queries), 1)
+        self.assertIn('"posts_timelineentry"."user_id" =', posts_queries[0])
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.utils import (CursorPage, decode_cursor, encode_cursor,
+                         encode_token)
+from users.forms import User
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.test_group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        objs = ()
+        for i in range(1, 2 * settings.NUMBER_OF_LAST_RECORDS + 4):
+            objs += (Post(
+                text=f'Пост №{i}',
+                author=cls.user,
+                group=cls.test_group,
+            )),
+        Post.objects.bulk_create(objs)
+        cls.all_posts = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def walk_forward(self, url):
+        seen = []
+        response = self.authorized_client.get(url + '?after=')
+        while True:
+            page_obj = response.context['page_obj']
+            self.assertIsInstance(page_obj, CursorPage)
+            seen.extend(page_obj)
+            if not page_obj.has_next():
+                return seen, page_obj
+            response = self.authorized_client.get(
+                url + f'?after={page_obj.next_cursor}'
+            )
+
+    def test_posts_cursor_pages_cover_every_post_once(self):
+        """Check if walking the cursor pages returns every post in order"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'group_name': self.test_group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                seen, _ = self.walk_forward(url)
+                self.assertEqual(seen, self.all_posts)
+
+    def test_posts_cursor_before_returns_previous_page(self):
+        """Check if ?before= returns the page preceding the cursor"""
+        url = reverse('posts:index')
+        first_page = self.authorized_client.get(url + '?after=')
+        second_page = self.authorized_client.get(
+            url + f'?after={first_page.context["page_obj"].next_cursor}'
+        )
+        back = self.authorized_client.get(
+            url + f'?before={second_page.context["page_obj"].previous_cursor}'
+        )
+        self.assertEqual(
+            list(back.context['page_obj']),
+            list(first_page.context['page_obj'])
+        )
+        self.assertFalse(back.context['page_obj'].has_previous())
+
+    def test_posts_deep_cursor_page_does_not_count(self):
+        """Check if a deep cursor page costs the same queries as the first"""
+        url = reverse('posts:index')
+        _, last_page = self.walk_forward(url)
+        token = encode_cursor(
+            (last_page[0].pub_date, last_page[0].id)
+        )
+        with self.assertNumQueries(3):
+            self.authorized_client.get(url + f'?after={token}')
+
+    @override_settings(POSTS_PAGINATION='cursor')
+    def test_posts_cursor_mode_can_be_enabled_in_settings(self):
+        """Check if POSTS_PAGINATION switches views to the cursor pages"""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsInstance(response.context['page_obj'], CursorPage)
+
+    def test_posts_broken_cursor_returns_first_page(self):
+        """Check if a damaged token falls back to the first page"""
+        self.assertIsNone(decode_cursor('not-a-token'))
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?after=not-a-token'
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.all_posts[:settings.NUMBER_OF_LAST_RECORDS]
+        )
+
+    def test_posts_cursor_with_out_of_range_id_returns_first_page(self):
+        """Check if a token with an id SQLite can't hold is damaged"""
+        date = self.all_posts[0].pub_date.isoformat()
+        first_page = self.all_posts[:settings.NUMBER_OF_LAST_RECORDS]
+        for pk in (2 ** 63, -2 ** 63 - 1, 2 ** 70, True):
+            token = encode_token([date, pk])
+            with self.subTest(pk=pk):
+                self.assertIsNone(decode_cursor(token))
+                response = self.authorized_client.get(
+                    reverse('posts:index') + f'?after={token}'
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    list(response.context['page_obj']), first_page
+                )
+        self.assertIsNotNone(decode_cursor(encode_token([date, 2 ** 63 - 1])))
@@ -4,8 +4,11 @@ import tempfile
 
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Comment, Follow, Group, Post
@@ -496,3 +499,219 @@ class PostPaginatorTest(TestCase):
             len(response.context['page_obj']),
             self.last_page_records_number(all_profile_posts_number)
         )
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        cls.commenters = [
+            User.objects.create_user(username=f'Commenter {i}')
+            for i in range(7)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=commenter,
+                text=f'Комментарий №{i}',
+            )
+            for i, commenter in enumerate(cls.commenters)
+        ]
+
+    def test_post_detail_shows_first_page_of_comments(self):
+        """Check post detail shows only the newest page of comments"""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.id for comment in comments],
+            [comment.id for comment in self.comments[:-4:-1]],
+        )
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+            + f'?after={comments.next_cursor}',
+        )
+
+    def test_comment_authors_load_with_comments(self):
+        """Check comment authors do not cost a query per comment"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        user_queries = [
+            query for query in queries.captured_queries
+            if 'FROM "auth_user"' in query['sql']
+        ]
+        self.assertEqual(user_queries, [])
+
+    def test_post_comments_fragment_continues_the_list(self):
+        """Check the load more fragment returns the following comments"""
+        seen = []
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        while url:
+            response = self.client.get(url)
+            comments = response.context['comments']
+            self.assertLessEqual(len(comments), settings.COMMENTS_PER_PAGE)
+            seen += [comment.id for comment in comments]
+            url = comments.has_next() and (
+                reverse('posts:post_comments',
+                        kwargs={'post_id': self.post.id})
+                + f'?after={comments.next_cursor}'
+            )
+        self.assertEqual(
+            seen, [comment.id for comment in reversed(self.comments)]
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+
+    def test_post_comments_fragment_of_missing_post(self):
+        """Check the comments fragment of a missing post is 404"""
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('posts:add_comment_fragment',
+                           kwargs={'post_id': self.post.id})
+
+    def test_comment_fragment_returns_only_the_new_comment(self):
+        """Check a fetch comment is saved and answered with its fragment"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.post(
+                self.url, {'text': 'Новый комментарий'}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTemplateUsed(response, 'posts/includes/comment.html')
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertContains(response, 'Новый комментарий', status_code=201)
+        self.assertTrue(
+            Comment.objects.filter(
+                post=self.post, author=self.user, text='Новый комментарий'
+            ).exists()
+        )
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_comment"' in query['sql']
+        ])
+
+    def test_comment_fragment_form_errors_are_json(self):
+        """Check an invalid comment gets 400 with the form errors"""
+        response = self.authorized_client.post(self.url, {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_comment_fragment_needs_login_and_post(self):
+        """Check anonymous, GET and missing post requests save nothing"""
+        self.assertEqual(
+            self.client.post(self.url, {'text': 'Текст'}).status_code, 401
+        )
+        self.assertEqual(self.authorized_client.get(self.url).status_code,
+                         405)
+        response = self.authorized_client.post(
+            reverse('posts:add_comment_fragment', kwargs={'post_id': 0}),
+            {'text': 'Текст'},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_comment_form_posts_to_both_endpoints(self):
+        """Check the comment form keeps add_comment as the no-JS fallback"""
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertContains(
+            response,
+            'action="'
+            + reverse('posts:add_comment', kwargs={'post_id': self.post.id})
+            + '"',
+        )
+        self.assertContains(response, f'data-url="{self.url}"')
+
+
+@override_settings(NUMBER_OF_LAST_RECORDS=3)
+class PostCardsFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Name')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.test_group = Group.objects.create(
+            title='Заголовок тестовой группы',
+            description='Описание тестовой группы',
+            slug='test-slug',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for i in range(8):
+            Post.objects.create(
+                text=f'Пост №{i}',
+                author=cls.user,
+                group=cls.test_group if i % 2 else None,
+            )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        posts = Post.objects.order_by('-pub_date', '-id')
+        group = {'group_name': self.test_group.slug}
+        author = {'username': self.user.username}
+        self.feeds = (
+            ('posts:index', 'posts:index_cards', {}, posts),
+            ('posts:group_list', 'posts:group_cards', group,
+             posts.filter(group=self.test_group)),
+            ('posts:profile', 'posts:profile_cards', author, posts),
+            ('posts:follow_index', 'posts:follow_cards', {}, posts),
+        )
+
+    def test_cards_fragments_continue_every_feed(self):
+        """Check if scrolling by fragments lists each feed exactly once"""
+        for page, cards, kwargs, posts in self.feeds:
+            with self.subTest(feed=cards):
+                response = self.reader_client.get(reverse(page, kwargs=kwargs))
+                seen = [post.id for post in response.context['page_obj']]
+                url = (
+                    reverse(cards, kwargs=kwargs) + '?after='
+                    + response.context['cursor']
+                )
+                self.assertContains(response, f'data-url="{url}"')
+                while url:
+                    response = self.reader_client.get(url)
+                    self.assertTemplateUsed(
+                        response, 'posts/includes/post_cards.html'
+                    )
+                    self.assertTemplateNotUsed(response, 'base.html')
+                    seen += [post.id for post in response.context['page_obj']]
+                    url = response.context['cursor'] and (
+                        reverse(cards, kwargs=kwargs) + '?after='
+                        + response.context['cursor']
+                    )
+                self.assertEqual(
+                    seen, list(posts.values_list('id', flat=True))
+                )
+
+    def test_cards_fragment_errors(self):
+        """Check fragments of missing feeds and anonymous follows"""
+        for name, kwargs in (
+            ('posts:group_cards', {'group_name': 'missing'}),
+            ('posts:profile_cards', {'username': 'missing'}),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('posts:follow_cards'))
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,78 @@
+import threading
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from posts.writer import WriteQueue
+from users.forms import User
+
+
+class WriteQueueTest(TransactionTestCase):
+    def setUp(self) -> None:
+        self.queue = WriteQueue(DEFAULT_DB_ALIAS, batch_size=10,
+                                batch_wait=0.05)
+        self.addCleanup(self.queue.stop)
+
+    def test_waiting_jobs_share_one_transaction(self):
+        """Check if jobs queued behind a busy writer commit as one batch"""
+        release = threading.Event()
+        with mock.patch.object(self.queue, 'commit',
+                               wraps=self.queue.commit) as commit:
+            first = self.queue.submit(release.wait)
+            futures = [
+                self.queue.submit(
+                    lambda: connections[DEFAULT_DB_ALIAS].in_atomic_block
+                )
+                for _ in range(3)
+            ]
+            release.set()
+            self.assertTrue(first.result(5))
+            self.assertTrue(all(future.result(5) for future in futures))
+        batches = [len(batch) for (batch,), _ in commit.call_args_list]
+        self.assertEqual(sum(batches), 4)
+        self.assertGreaterEqual(max(batches), 3)
+
+    def test_failed_job_does_not_undo_the_batch(self):
+        """Check if an error reaches only the job that raised it"""
+        user = User.objects.create_user(username='Writer')
+        release = threading.Event()
+        self.queue.submit(release.wait)
+        created = self.queue.submit(
+            lambda: Post.objects.create(text='Запись', author=user).pk
+        )
+        failed = self.queue.submit(lambda: 1 / 0)
+        release.set()
+        self.assertTrue(Post.objects.filter(pk=created.result(5)).exists())
+        with self.assertRaises(ZeroDivisionError):
+            failed.result(5)
+
+
+@override_settings(POSTS_WRITE_QUEUE=True)
+class WriteQueueViewsTest(TransactionTestCase):
+    def setUp(self) -> None:
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.post = Post.objects.create(text='Запись', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_comment_and_follow_go_through_the_writer(self):
+        """Check if queued writes are committed before the redirect"""
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'},
+        )
+        self.assertRedirects(
+            response,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+        self.assertTrue(Comment.objects.filter(text='Комментарий').exists())
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.author.username}))
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .exists()
+        )
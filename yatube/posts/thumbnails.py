@@ -0,0 +1,244 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_FORMAT = 'JPEG'
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_progress = set()
+
+
+@dataclass(frozen=True)
+class Variant:
+    format: str
+    width: int
+    geometry: str
+    options: tuple
+
+    @property
+    def mime_type(self):
+        return Image.MIME[self.format]
+
+
+@dataclass
+class Picture:
+    """Готовые варианты одной миниатюры для тега <picture>."""
+
+    fallback: ImageFile
+    sources: list = field(default_factory=list)
+
+    @property
+    def url(self):
+        return self.fallback.url
+
+    @property
+    def width(self):
+        return self.fallback.width
+
+    @property
+    def height(self):
+        return self.fallback.height
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def image_formats():
+    """Форматы из POST_THUMBNAIL_FORMATS, которые умеют sorl и Pillow."""
+    Image.init()
+    return [
+        image_format for image_format in settings.POST_THUMBNAIL_FORMATS
+        if image_format in EXTENSIONS and image_format in Image.SAVE
+        and image_format in Image.MIME
+    ]
+
+
+def variants(name):
+    """Варианты миниатюры name: все ширины во всех форматах.
+
+    Последним идёт JPEG полной ширины из POST_THUMBNAILS — его получают
+    браузеры без поддержки <picture>.
+    """
+    geometry, options = settings.POST_THUMBNAILS[name]
+    width, height = (int(size) for size in geometry.split('x'))
+    widths = sorted(
+        size for size in {*settings.POST_THUMBNAIL_WIDTHS, width}
+        if size <= width
+    )
+    result = []
+    for image_format in (*image_formats(), FALLBACK_FORMAT):
+        for size in widths:
+            result.append(Variant(
+                image_format,
+                size,
+                f'{size}x{round(height * size / width)}',
+                tuple({**options, 'format': image_format}.items()),
+            ))
+    return result
+
+
+def thumbnail_file(image, geometry, options):
+    """Файл миниатюры под тем именем, которое даст ему sorl, без генерации."""
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def lookup_files(files):
+    """Записи хранилища sorl для файлов миниатюр: {ключ: файл или None}.
+
+    Для хранилища на кеше и БД записи читаются одним get_many из кеша
+    и одним запросом к БД для промахов, а не отдельно на каждый файл.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore.get(file) for key, file in files.items()}
+    keys = {key: add_prefix(file.key) for key, file in files.items()}
+    values = kvstore.cache.get_many(set(keys.values()))
+    missing = set(keys.values()) - set(values)
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value')
+        )
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(fetched)
+    return {
+        key: (
+            None if values[store_key] == EMPTY_VALUE
+            else deserialize_image_file(values[store_key])
+        )
+        for key, store_key in keys.items()
+    }
+
+
+def ready_thumbnails(images, name):
+    """Готовые миниатюры сразу для нескольких картинок: {image: Picture}.
+
+    Картинке без готового JPEG соответствует None — шаблон покажет
+    исходный файл. Неготовые варианты других форматов пропускаются.
+    """
+    images = [image for image in images if image]
+    image_variants = variants(name)
+    files = lookup_files({
+        (image, variant): thumbnail_file(
+            image, variant.geometry, dict(variant.options)
+        )
+        for image in images
+        for variant in image_variants
+    })
+    pictures = {}
+    for image in images:
+        fallback = files[image, image_variants[-1]]
+        if fallback is None:
+            pictures[image] = None
+            continue
+        picture = Picture(fallback)
+        for image_format in dict.fromkeys(
+            variant.format for variant in image_variants
+        ):
+            ready = [
+                (variant, files[image, variant]) for variant in image_variants
+                if variant.format == image_format
+                and files[image, variant] is not None
+            ]
+            if ready:
+                picture.sources.append({
+                    'type': ready[0][0].mime_type,
+                    'srcset': ', '.join(
+                        f'{file.url} {variant.width}w'
+                        for variant, file in ready
+                    ),
+                })
+        pictures[image] = picture
+    return pictures
+
+
+def ready_thumbnail(image, name):
+    """Готовая миниатюра из POST_THUMBNAILS или None.
+
+    Миниатюра сама не создаётся: пока её не сделал фоновый пул,
+    страница показывает исходную картинку.
+    """
+    if not image:
+        return None
+    return ready_thumbnails([image], name)[image]
+
+
+def prefetch_thumbnails(posts, name):
+    """Кладёт в post.thumbnails[name] готовую миниатюру каждой записи."""
+    posts = [post for post in posts if post.image]
+    thumbnails = ready_thumbnails([post.image for post in posts], name)
+    for post in posts:
+        if not hasattr(post, 'thumbnails'):
+            post.thumbnails = {}
+        post.thumbnails[name] = thumbnails[post.image]
+
+
+def generate_thumbnails(image_name):
+    try:
+        for name in settings.POST_THUMBNAILS:
+            for variant in variants(name):
+                get_thumbnail(
+                    image_name, variant.geometry, **dict(variant.options)
+                )
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image_name)
+    finally:
+        _in_progress.discard(image_name)
+
+
+def generate_in_background(image_name):
+    try:
+        generate_thumbnails(image_name)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(image_name):
+    """Генерирует все миниатюры картинки в пуле фоновых потоков.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу, в текущем потоке.
+    """
+    if not image_name or image_name in _in_progress:
+        return
+    _in_progress.add(image_name)
+    if not settings.THUMBNAIL_WORKERS:
+        generate_thumbnails(image_name)
+        return
+    get_executor().submit(generate_in_background, image_name)
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+
+
+def trim_timelines(user_ids):
+    """Оставляет в лентах только TIMELINE_MAX_LENGTH последних записей."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    table = TimelineEntry._meta.db_table
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'  SELECT id FROM ('
+            f'    SELECT id, ROW_NUMBER() OVER ('
+            f'      PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+            f'    ) AS position'
+            f'    FROM {table} WHERE user_id IN ({placeholders})'
+            f'  ) WHERE position > %s'
+            f')',
+            [*user_ids, settings.TIMELINE_MAX_LENGTH],
+        )
+
+
+def fan_out_post(post):
+    """Раскладывает новую запись по лентам подписчиков автора.
+
+    Ленты здесь не обрезаются: у популярного автора это сортировка
+    миллионов строк на каждую запись. Лишние записи убирает
+    периодический rebuild_timelines --trim-only.
+    """
+    follower_ids = set(
+        Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.id,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту подписчика последние записи автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by(
+        '-pub_date', '-id'
+    ).values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_MAX_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_timelines((user_id,))
+
+
+def drop_from_timeline(user_id, author_id):
+    """Убирает из ленты подписчика записи автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        author_id=author_id,
+    ).delete()
+
+
+def rebuild_timelines(user_ids):
+    """Собирает ленты подписчиков заново одним INSERT … SELECT.
+
+    Сначала у каждого автора, на которого подписан кто-то из user_ids,
+    берутся TIMELINE_MAX_LENGTH последних записей, затем у каждого
+    подписчика — столько же самых свежих из записей его авторов.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    timeline = TimelineEntry._meta.db_table
+    follow = Follow._meta.db_table
+    post = Post._meta.db_table
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    length = settings.TIMELINE_MAX_LENGTH
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH readers AS ('
+            f'  SELECT user_id, author_id FROM {follow}'
+            f'  WHERE user_id IN ({placeholders})'
+            f'), recent AS ('
+            f'  SELECT id, author_id, pub_date FROM ('
+            f'    SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            f'      PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            f'    ) AS position'
+            f'    FROM {post}'
+            f'    WHERE author_id IN (SELECT author_id FROM readers)'
+            f'  ) WHERE position <= %s'
+            f') '
+            f'INSERT INTO {timeline} (user_id, post_id, author_id, pub_date) '
+            f'SELECT user_id, id, author_id, pub_date FROM ('
+            f'  SELECT readers.user_id, recent.id, recent.author_id,'
+            f'    recent.pub_date, ROW_NUMBER() OVER ('
+            f'      PARTITION BY readers.user_id'
+            f'      ORDER BY recent.pub_date DESC, recent.id DESC'
+            f'    ) AS position'
+            f'  FROM readers'
+            f'  JOIN recent ON recent.author_id = readers.author_id'
+            f') WHERE position <= %s',
+            [*user_ids, length, length],
+        )
+
+
+def rebuild_timeline(user_id):
+    """Собирает ленту подписчика заново по текущим подпискам."""
+    rebuild_timelines((user_id,))
@@ -1,21 +1,59 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('cards/', views.index_cards, name='index_cards'),
     path('group/<slug:group_name>/', views.group_list, name='group_list'),
+    path('group/<slug:group_name>/cards/',
+         views.group_cards,
+         name='group_cards'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/cards/',
+         views.profile_cards,
+         name='profile_cards'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comment/fragment/',
+         views.add_comment_fragment,
+         name='add_comment_fragment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/cards/', views.follow_cards, name='follow_cards'),
+    path('follow/bulk/', views.follow_bulk, name='follow_bulk'),
+    path('search/', views.search, name='search'),
+    path('rss/', feeds.index_rss, name='index_rss'),
+    path('atom/', feeds.index_atom, name='index_atom'),
+    path('group/<slug:group_name>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:group_name>/atom/',
+         feeds.group_atom,
+         name='group_atom'),
+    path('profile/<str:username>/rss/',
+         feeds.profile_rss,
+         name='profile_rss'),
+    path('profile/<str:username>/atom/',
+         feeds.profile_atom,
+         name='profile_atom'),
+    path('api/', api.index, name='api_index'),
+    path('api/group/<slug:group_name>/',
+         api.group_list,
+         name='api_group_list'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
+    path('api/posts/', api.posts, name='api_posts'),
+    path('api/posts/<int:post_id>/',
+         api.post_detail,
+         name='api_post_detail'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,8 +1,167 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.utils.dateparse import parse_datetime
+
+from .counts import CachedCountPaginator
+
+CURSOR_PARAMS = ('after', 'before')
+# Целые, которые SQLite хранит в INTEGER: знаковые 64 бита
+MIN_DB_INT = -2 ** 63
+MAX_DB_INT = 2 ** 63 - 1
+
+
+def encode_token(values):
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Список значений из токена или None, если токен испорчен."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def encode_cursor(values):
+    return encode_token([values[0].isoformat(), values[1]])
+
+
+def is_db_int(value):
+    """Целое, которое можно передать в запрос без OverflowError."""
+    return (
+        isinstance(value, int) and not isinstance(value, bool)
+        and MIN_DB_INT <= value <= MAX_DB_INT
+    )
+
+
+def decode_cursor(token):
+    """Возвращает пару (дата, id) из токена или None, если он испорчен."""
+    values = decode_token(token)
+    try:
+        date, pk = values
+        date = parse_datetime(date)
+    except (TypeError, ValueError):
+        return None
+    if date is None or not is_db_int(pk):
+        return None
+    return date, pk
+
+
+class CursorPage(Sequence):
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = None
+        self.previous_cursor = None
+        if object_list:
+            if has_next:
+                self.next_cursor = paginator.cursor_for(object_list[-1])
+            if has_previous:
+                self.previous_cursor = paginator.cursor_for(object_list[0])
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self)} objects>'
 
+    def __len__(self):
+        return len(self.object_list)
 
-def get_page(request, posts):
-    paginator = Paginator(posts, settings.NUMBER_OF_LAST_RECORDS)
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу (дата, id) без COUNT и OFFSET.
+
+    Запросы страниц опираются на индекс по ключу, поэтому любая страница
+    стоит столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id')):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.date_key, self.id_key = keys
+
+    def cursor_for(self, obj):
+        return encode_cursor(
+            (getattr(obj, self.date_key), getattr(obj, self.id_key))
+        )
+
+    def _after(self, cursor):
+        date, pk = cursor
+        return self.object_list.filter(
+            **{f'{self.date_key}__lte': date}
+        ).exclude(
+            **{self.date_key: date, f'{self.id_key}__gte': pk}
+        )
+
+    def _before(self, cursor):
+        date, pk = cursor
+        return self.object_list.filter(
+            **{f'{self.date_key}__gte': date}
+        ).exclude(
+            **{self.date_key: date, f'{self.id_key}__lte': pk}
+        )
+
+    def get_page(self, after=None, before=None):
+        after = after and decode_cursor(after)
+        before = before and decode_cursor(before)
+        if before and not after:
+            queryset = self._before(before).order_by(
+                self.date_key, self.id_key
+            )
+            objects = list(queryset[:self.per_page + 1])
+            has_previous = len(objects) > self.per_page
+            objects = objects[:self.per_page][::-1]
+            return CursorPage(objects, self, True, has_previous)
+        queryset = self.object_list
+        if after:
+            queryset = self._after(after)
+        queryset = queryset.order_by(f'-{self.date_key}', f'-{self.id_key}')
+        objects = list(queryset[:self.per_page + 1])
+        has_next = len(objects) > self.per_page
+        return CursorPage(
+            objects[:self.per_page], self, has_next, bool(after)
+        )
+
+
+def get_page(request, posts, keys=('pub_date', 'id')):
+    cursor_requested = any(param in request.GET for param in CURSOR_PARAMS)
+    if cursor_requested or settings.POSTS_PAGINATION == 'cursor':
+        paginator = CursorPaginator(
+            posts, settings.NUMBER_OF_LAST_RECORDS, keys
+        )
+        return paginator.get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    paginator = CachedCountPaginator(posts, settings.NUMBER_OF_LAST_RECORDS)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def get_comments_page(post, after=None):
+    """Страница комментариев записи: авторы загружаются тем же запросом."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        keys=('created', 'id'),
+    )
+    return paginator.get_page(after=after)
@@ -1,65 +1,104 @@
+import json
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition, require_POST
 
+from .api import api_login_required
+from .caches import (SITE_SCOPE, author_scope, feed_cache_context,
+                     group_scope)
+from .conditional import (author_scopes, conditional_funcs,
+                          group_list_scopes, index_scopes,
+                          post_detail_scopes, profile_scopes)
+from .counters import counters_for
+from .counts import get_count
+from .follows import (change_follows, follow, followed_author_ids,
+                      is_following, unfollow)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_page
+from .models import Comment, Follow, Group, Post, User
+from .search import SearchPaginator
+from .utils import CursorPaginator, get_comments_page, get_page
+from .writer import perform
 
 
+@condition(**conditional_funcs(index_scopes))
 def index(request):
     posts = Post.objects.select_related('group', 'author')
     context = {
         'page_obj': get_page(request, posts),
+        **feed_cache_context(request, SITE_SCOPE),
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(**conditional_funcs(group_list_scopes))
 def group_list(request, group_name):
     group = get_object_or_404(Group, slug=group_name)
     posts = group.posts.select_related('author')
     context = {
         'group': group,
         'page_obj': get_page(request, posts),
+        **feed_cache_context(request, group_scope(group.id)),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(**conditional_funcs(profile_scopes))
 def profile(request, username):
-    user = request.user
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username,
+    )
     posts = author.posts.select_related('group')
-    following = (user.is_authenticated
-                 and user.id != author.id
-                 and Follow.objects.filter(
-                     user=user,
-                     author=author,
-                 ).exists()
-                 )
+    counters = counters_for(author)
     context = {
         'author': author,
+        'counters': counters,
         'page_obj': get_page(request, posts),
-        'posts_count': posts.count(),
-        'following': following,
+        'posts_count': counters.posts_count,
+        'following': is_following(request.user, author),
+        **feed_cache_context(request, author_scope(author.id)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(**conditional_funcs(post_detail_scopes))
 def post_detail(request, post_id):
-    chosen_post = get_object_or_404(Post, pk=post_id)
-    comments = chosen_post.comments.all()
+    chosen_post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        pk=post_id,
+    )
+    comments = get_comments_page(
+        chosen_post, request.GET.get('comments_after')
+    )
     form = CommentForm(
         request.POST or None,
     )
     context = {
         'chosen_post': chosen_post,
+        'author_counters': counters_for(chosen_post.author),
         'comments': comments,
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@condition(**conditional_funcs(post_detail_scopes))
+def post_comments(request, post_id):
+    chosen_post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    context = {
+        'chosen_post': chosen_post,
+        'comments': get_comments_page(chosen_post, request.GET.get('after')),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -74,6 +113,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     chosen_post = get_object_or_404(Post, pk=post_id)
     if request.user != chosen_post.author:
@@ -97,28 +137,102 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = chosen_post
-        comment.save()
+        perform(Comment, comment.save)
     return redirect('posts:post_detail', post_id)
 
 
+@require_POST
+@api_login_required
+def add_comment_fragment(request, post_id):
+    """add_comment для fetch: вместо перехода отвечает HTML комментария.
+
+    Ошибки формы возвращаются в JSON со статусом 400.
+    """
+    chosen_post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    form = CommentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse(
+            {'errors': form.errors.get_json_data()}, status=400
+        )
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = chosen_post
+    perform(Comment, comment.save)
+    return render(
+        request, 'posts/includes/comment.html', {'comment': comment},
+        status=201,
+    )
+
+
 @login_required
 def follow_index(request):
-    authors = request.user.follower.values_list('author', flat=True)
-    posts = Post.objects.filter(author__id__in=authors)
+    entries = request.user.timeline.select_related(
+        'post__author',
+        'post__group',
+    )
+    if not followed_author_ids(request.user.id):
+        entries = entries.none()
+    page_obj = get_page(request, entries, keys=('pub_date', 'post_id'))
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {
-        'posts': posts,
-        'page_obj': get_page(request, posts),
-        'posts_count': posts.count(),
+        'page_obj': page_obj,
+        'posts_count': get_count(entries),
     }
     return render(request, 'posts/follow.html', context)
 
 
+def next_cards(request, posts, keys=('pub_date', 'id')):
+    paginator = CursorPaginator(
+        posts, settings.NUMBER_OF_LAST_RECORDS, keys
+    )
+    return paginator.get_page(after=request.GET.get('after'))
+
+
+def render_cards(request, page_obj, **flags):
+    """Только карточки записей и ссылка на следующие, без страницы."""
+    context = {'page_obj': page_obj, 'cards_url': request.path, **flags}
+    return render(request, 'posts/includes/post_cards.html', context)
+
+
+@condition(**conditional_funcs(index_scopes))
+def index_cards(request):
+    posts = Post.objects.select_related('group', 'author')
+    return render_cards(request, next_cards(request, posts))
+
+
+@condition(**conditional_funcs(group_list_scopes))
+def group_cards(request, group_name):
+    group = get_object_or_404(Group.objects.only('id'), slug=group_name)
+    posts = group.posts.select_related('author')
+    return render_cards(
+        request, next_cards(request, posts), is_group_list=True
+    )
+
+
+@condition(**conditional_funcs(author_scopes))
+def profile_cards(request, username):
+    author = get_object_or_404(User, username=username)
+    posts = author.posts.select_related('group')
+    return render_cards(request, next_cards(request, posts), is_profile=True)
+
+
+@api_login_required
+def follow_cards(request):
+    entries = request.user.timeline.select_related(
+        'post__author',
+        'post__group',
+    )
+    page_obj = next_cards(request, entries, keys=('pub_date', 'post_id'))
+    page_obj.object_list = [entry.post for entry in page_obj]
+    return render_cards(request, page_obj)
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
     if user.id != author.id:
-        Follow.objects.create(user=user, author=author)
+        follow(user, author)
     else:
         messages.error(request, 'Нельзя подписаться на самого себя')
     return redirect('posts:profile', username)
@@ -127,6 +241,50 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    Follow.objects.filter(user=user, author=author).delete()
+    unfollow(request.user, author)
     return redirect('posts:profile', username)
+
+
+def read_usernames(data, field):
+    names = data.get(field, [])
+    if (not isinstance(names, list)
+            or not all(isinstance(name, str) for name in names)):
+        raise ValueError(f'{field} должен быть списком имён пользователей')
+    return names
+
+
+@api_login_required
+@require_POST
+def follow_bulk(request):
+    """Подписки и отписки списком в одной транзакции.
+
+    Тело запроса: {"follow": [username, ...], "unfollow": [...]}.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError('Ожидается JSON-объект')
+        follow_names = read_usernames(data, 'follow')
+        unfollow_names = read_usernames(data, 'unfollow')
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    if len(follow_names) + len(unfollow_names) > settings.FOLLOW_BULK_LIMIT:
+        return JsonResponse(
+            {'error': f'Не больше {settings.FOLLOW_BULK_LIMIT} авторов '
+                      'за запрос'},
+            status=400,
+        )
+    return JsonResponse(perform(Follow, lambda: change_follows(
+        request.user, follow_names, unfollow_names
+    )))
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, settings.NUMBER_OF_LAST_RECORDS)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('after')),
+        'search_available': paginator.available,
+    }
+    return render(request, 'posts/search.html', context)
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+
+class WriteQueue:
+    """Поток-писатель: задания из очереди коммитятся небольшими пачками.
+
+    SQLite пропускает одного писателя за раз, и конкурирующие запросы
+    ждут друг друга на блокировке. Здесь писатель один, а пачка из
+    WRITE_BATCH_SIZE заданий идёт одной транзакцией; каждое задание
+    в своей точке сохранения, так что ошибка одного не отменяет другие.
+    """
+
+    def __init__(self, using, batch_size, batch_wait):
+        self.using = using
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, job):
+        """Ставит job в очередь и возвращает Future с его результатом."""
+        future = Future()
+        self.start()
+        self.jobs.put((job, future))
+        return future
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name=f'writer-{self.using}', daemon=True
+                )
+                self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.jobs.put(None)
+            thread.join()
+
+    def next_batch(self):
+        batch = [self.jobs.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            try:
+                batch.append(
+                    self.jobs.get(timeout=max(deadline - time.monotonic(), 0))
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        connection = connections[self.using]
+        try:
+            while True:
+                batch = self.next_batch()
+                stop = batch[-1] is None
+                if stop:
+                    batch.pop()
+                if batch:
+                    self.commit(batch)
+                connection.close_if_unusable_or_obsolete()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def commit(self, batch):
+        results = []
+        try:
+            with transaction.atomic(using=self.using):
+                for job, future in batch:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            results.append((future, job(), None))
+                    except Exception as error:
+                        results.append((future, None, error))
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def write_queue(using):
+    with _queues_lock:
+        if using not in _queues:
+            _queues[using] = WriteQueue(
+                using,
+                settings.WRITE_BATCH_SIZE,
+                settings.WRITE_BATCH_WAIT,
+            )
+        return _queues[using]
+
+
+def perform(model, job):
+    """Выполняет запись job() и возвращает её результат.
+
+    При POSTS_WRITE_QUEUE запись уходит потоку-писателю, а запрос ждёт
+    её коммита; иначе выполняется сразу в своей транзакции. Внутри
+    транзакции запроса ждать писателя нельзя: он упрётся в её блокировку.
+    """
+    using = router.db_for_write(model)
+    if (not settings.POSTS_WRITE_QUEUE
+            or connections[using].in_atomic_block):
+        with transaction.atomic(using=using):
+            return job()
+    return write_queue(using).submit(job).result(settings.WRITE_TIMEOUT)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -30,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,7 +47,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -68,6 +71,37 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Боевой профиль SQLite: WAL, редкий fsync, mmap, ожидание блокировки
+# вместо ошибки, постоянные соединения и транзакции с BEGIN IMMEDIATE.
+# PRAGMAS выставляет core.signals каждому новому соединению.
+SQLITE_PRODUCTION_PROFILE = {
+    'ENGINE': 'core.db',
+    'TRANSACTION_MODE': 'IMMEDIATE',
+    'CONN_MAX_AGE': 600,
+    'PRAGMAS': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+}
+if os.environ.get('YATUBE_DB_PROFILE') == 'production':
+    DATABASES['default'].update(SQLITE_PRODUCTION_PROFILE)
+# Локальные реплики SQLite: YATUBE_SQLITE_REPLICAS=2 добавляет replica1 и
+# replica2, а manage.py sync_replicas копирует в них основную базу.
+for number in range(1, int(os.environ.get('YATUBE_SQLITE_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db-replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Приложения, GET-страницы которых читают из реплик
+REPLICA_APPS = ('posts',)
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_PIN_SECONDS = 10
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -115,11 +149,28 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.backends.MetricsCache',
+        'OPTIONS': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    },
+    # Версии лент и карточек и отметки Last-Modified: из них строятся
+    # ключи кеша и ETag, поэтому все процессы должны видеть одни и те же
+    # значения. Файлы годятся для процессов одного хоста; для нескольких
+    # хостов нужен memcached.
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_VERSIONS_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'yatube-versions'),
+        ),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
 }
 
 NUMBER_OF_LAST_RECORDS = 10
+COMMENTS_PER_PAGE = 20
 MAX_GROUP_SELF_TEXT_LENGTH = 30
 MAX_POST_SELF_TEXT_LENGTH = 15
 MAX_COMMENT_SELF_TEXT_LENGTH = 15
@@ -127,3 +178,61 @@ MAX_FOLLOW_SELF_TEXT_LENGTH = 15
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Новые записи ленты не обрезают, до этой длины ленты обрезает
+# периодический запуск manage.py rebuild_timelines --trim-only
+TIMELINE_MAX_LENGTH = 1000
+TIMELINE_BATCH_SIZE = 500
+# 'page' — нумерованные страницы, 'cursor' — страницы по ?after=/?before=
+POSTS_PAGINATION = 'page'
+
+COUNT_CACHE_TIMEOUT = 60 * 10
+# Выше этого числа строк COUNT(*) по всей таблице заменяется оценкой по
+# статистике ANALYZE; её собирают seed и manage.py update_statistics
+COUNT_ESTIMATE_THRESHOLD = 100_000
+
+FEED_CACHE_TIMEOUT = 60 * 5
+# Ключ карточки содержит версию записи из общего кеша 'versions', так что
+# устаревшие карточки не показываются ни одним процессом, а только
+# дожидаются вытеснения
+CARD_CACHE_TIMEOUT = 60 * 60
+LAST_MODIFIED_CACHE_TIMEOUT = 60 * 60 * 24
+# Подписки сбрасываются только в кеше того процесса, где изменились:
+# пока CACHES['default'] у каждого процесса свой, набор живёт секунды
+FOLLOW_GRAPH_CACHE_TIMEOUT = 10
+# Сколько авторов можно передать в один запрос follow/bulk/
+FOLLOW_BULK_LIMIT = 500
+# Комментарии и подписки пишет один поток-писатель пачками до
+# WRITE_BATCH_SIZE, собирая пачку не дольше WRITE_BATCH_WAIT секунд
+POSTS_WRITE_QUEUE = False
+WRITE_BATCH_SIZE = 50
+WRITE_BATCH_WAIT = 0.002
+# Сколько секунд запрос ждёт коммита своей записи
+WRITE_TIMEOUT = 10
+
+SEARCH_SNIPPET_TOKENS = 16
+# Сколько записей можно запросить одним api/posts/?ids=
+API_MAX_IDS = 100
+# Сколько последних записей попадает в ленты RSS и Atom
+SYNDICATION_ITEMS = 20
+
+# Размеры миниатюр картинок записей: имя -> (геометрия, опции sorl)
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Ширины вариантов миниатюр для srcset, высота — в пропорции миниатюры
+POST_THUMBNAIL_WIDTHS = (480, 720, 960)
+# Форматы вариантов помимо JPEG; недоступные в sorl и Pillow пропускаются
+POST_THUMBNAIL_FORMATS = ('AVIF', 'WEBP')
+# 0 — создавать миниатюры сразу, в потоке запроса
+THUMBNAIL_WORKERS = 2
+
+# Файлы метрик процессов, которые /metrics складывает при чтении
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube-metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+# Токен для заголовка «Authorization: Bearer <токен>»; без него /metrics закрыт
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
+# Прошлый замер manage.py benchmark, с которым сравнивается новый
+BENCHMARK_BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')